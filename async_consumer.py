@@ -0,0 +1,406 @@
+#!/usr/bin/env python3
+"""
+Consumer en pipeline con asyncio
+Tres etapas unidas por colas acotadas:
+- Lectura: detecta cambios y lee solo los bytes nuevos (confirmados) de cada archivo
+- Parseo: convierte los fragmentos en números en un pool de hilos o procesos
+- Agregación: ventanas, sketches, veracidad, capacidad y salida por consola
+
+Mientras se parsea un lote ya se está leyendo el siguiente. Cuando una etapa es
+lenta su cola de entrada se llena y la anterior se bloquea (backpressure).
+"""
+
+import asyncio
+import json
+import signal
+import sys
+import time
+from collections import defaultdict, deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from pathlib import Path
+
+from consumer import BigDataConsumer, build_parser, consumer_arguments
+from profiling import percentile
+from publication import file_signature, read_manifest
+
+EXECUTORS = ('thread', 'process')
+
+
+def parse_chunk(kind, text, skip_header=False, limit=None):
+    """Convierte un fragmento de archivo en números (se ejecuta en el pool de parseo).
+
+    Las líneas que no son números se ignoran, igual que en los lectores secuenciales.
+    """
+    if kind == 'json':
+        try:
+            numbers = json.loads(text).get('numbers', [])
+        except json.JSONDecodeError:
+            return []
+        # Recortar a la generación confirmada para que coincida con el resto de formatos
+        return numbers if limit is None else numbers[:limit]
+
+    lines = text.splitlines()
+    if skip_header:
+        lines = lines[1:]
+    numbers = []
+    for line in lines:
+        value = line.split(',', 1)[0].strip() if kind == 'csv' else line.strip()
+        try:
+            numbers.append(int(value))
+        except ValueError:
+            continue
+    return numbers
+
+
+def _ignore_sigint():
+    """Los procesos del pool no deben reaccionar a Ctrl+C (lo gestiona el consumer)"""
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+
+class MonitoredQueue(asyncio.Queue):
+    """Cola acotada con métricas de profundidad y backpressure"""
+
+    def __init__(self, name, maxsize):
+        super().__init__(maxsize)
+        self.name = name
+        self.puts = 0
+        self.blocked_puts = 0     # Veces que el productor encontró la cola llena
+        self.blocked_time = 0.0   # Segundos bloqueado esperando hueco
+        self.max_depth = 0
+        self.depth_samples = []
+        self._blocked_since = None
+
+    async def put(self, item):
+        if self.full():
+            self.blocked_puts += 1
+            self._blocked_since = time.perf_counter()
+            try:
+                await super().put(item)
+            finally:
+                # También cuenta la espera interrumpida al detener el consumer
+                self.blocked_time += time.perf_counter() - self._blocked_since
+                self._blocked_since = None
+        else:
+            await super().put(item)
+        self.puts += 1
+        self.max_depth = max(self.max_depth, self.qsize())
+
+    def sample(self):
+        """Guarda y devuelve la profundidad actual"""
+        depth = self.qsize()
+        self.depth_samples.append(depth)
+        return depth
+
+    def total_blocked_time(self):
+        """Segundos de backpressure, incluida la espera en curso"""
+        if self._blocked_since is None:
+            return self.blocked_time
+        return self.blocked_time + time.perf_counter() - self._blocked_since
+
+    def metrics(self):
+        samples = self.depth_samples or [0]
+        return {
+            'depth': self.qsize(),
+            'maxsize': self.maxsize,
+            'max_depth': self.max_depth,
+            'mean_depth': sum(samples) / len(samples),
+            'puts': self.puts,
+            'blocked_puts': self.blocked_puts,
+            'blocked_time': self.total_blocked_time()
+        }
+
+
+class AsyncPipelineConsumer(BigDataConsumer):
+    """Consumer con lectura, parseo y agregación solapados en un pipeline asyncio"""
+
+    def __init__(self, *args, queue_size=4, parser_workers=2, parser_executor='thread', **kwargs):
+        super().__init__(*args, **kwargs)
+        if parser_executor not in EXECUTORS:
+            raise ValueError(f"Executor de parseo desconocido: {parser_executor}")
+        self.queue_size = queue_size
+        self.parser_workers = parser_workers
+        self.parser_executor = parser_executor
+        self.executor = None
+        self.read_queue = None
+        self.parsed_queue = None
+        
+        self.read_offsets = {}                 # Bytes ya leídos de cada archivo de texto
+        self.parsed_counts = defaultdict(int)  # Registros parseados por archivo
+        self.written_total = 0                 # Números publicados según el manifiesto del producer
+        self.consumed_counts = defaultdict(int)
+        self.sums = defaultdict(int)
+        self.pending = defaultdict(deque)      # Registros parseados pendientes de agregar
+        self.performance_data['queue_depths'] = []
+        self.performance_data['latencies'] = []
+
+    # --- Etapa de lectura -------------------------------------------------
+
+    def _read_chunk(self, filepath):
+        """Lee lo nuevo de un archivo: el JSON entero y, en TXT/CSV, solo los bytes añadidos"""
+        kind = Path(filepath).suffix.lstrip('.')
+        try:
+            if kind == 'json':
+                with open(filepath, 'r') as f:
+                    text = f.read()
+                limit = self.manifest.get('records') if self.manifest else None
+                return {'filepath': filepath, 'kind': kind, 'text': text, 'full': True,
+                        'skip_header': False, 'limit': limit}
+            
+            offset = self.read_offsets.get(filepath, 0)
+            committed = self._committed_length(filepath)
+            with open(filepath, 'rb') as f:
+                f.seek(offset)
+                data = f.read() if committed is None else f.read(max(committed - offset, 0))
+        except FileNotFoundError:
+            return None
+        
+        # Solo líneas completas: la última puede estar a medio escribir
+        end = data.rfind(b'\n')
+        if end < 0:
+            return None
+        self.read_offsets[filepath] = offset + end + 1
+        return {'filepath': filepath, 'kind': kind, 'text': data[:end + 1].decode(), 'full': False,
+                'skip_header': kind == 'csv' and offset == 0, 'limit': None}
+
+    def _read_batch(self):
+        """Lee los archivos que han cambiado (se ejecuta en un hilo para no bloquear el bucle)"""
+        started = time.perf_counter()
+        files_to_process = self.find_files_to_process()
+        if not files_to_process:
+            return None
+        self.manifest = read_manifest(self.data_folder)
+        self._update_written_total(self.manifest)
+        
+        chunks = []
+        for filepath in files_to_process:
+            signature = file_signature(filepath, self.manifest)
+            if signature == self.last_file_signatures.get(filepath):
+                continue
+            self.last_file_signatures[filepath] = signature
+            chunk = self._read_chunk(filepath)
+            if chunk:
+                chunks.append(chunk)
+        if not chunks:
+            return None
+        return {'started': started, 'chunks': chunks,
+                'read_ms': (time.perf_counter() - started) * 1000, 'parse_ms': 0.0}
+
+    def _update_written_total(self, manifest):
+        """Guarda los números que el producer ha publicado (lado del lector, no del parseo)"""
+        if manifest and manifest.get('records') is not None:
+            self.written_total = max(self.written_total, manifest['records'])
+
+    async def read_stage(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await loop.run_in_executor(None, self._read_batch)
+            if batch:
+                await self.read_queue.put(batch)
+            await asyncio.sleep(self.poll_interval)  # Intervalo de lectura
+
+    # --- Etapa de parseo --------------------------------------------------
+
+    async def parse_stage(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self.read_queue.get()
+            started = time.perf_counter()
+            # Los fragmentos de un lote se parsean en paralelo; los lotes, en orden
+            results = await asyncio.gather(*(
+                loop.run_in_executor(self.executor, parse_chunk, chunk['kind'], chunk['text'],
+                                     chunk['skip_header'], chunk['limit'])
+                for chunk in batch['chunks']))
+            for chunk, numbers in zip(batch['chunks'], results):
+                chunk['numbers'] = numbers
+                del chunk['text']
+            batch['parse_ms'] = (time.perf_counter() - started) * 1000
+            await self.parsed_queue.put(batch)
+
+    # --- Etapa de agregación ----------------------------------------------
+
+    async def aggregate_stage(self):
+        while True:
+            batch = await self.parsed_queue.get()
+            for chunk in batch['chunks']:
+                filepath = chunk['filepath']
+                seen = self.parsed_counts[filepath]
+                # El JSON llega entero: solo son nuevos los registros a partir de los ya vistos
+                new_numbers = chunk['numbers'][seen:] if chunk['full'] else chunk['numbers']
+                self.pending[filepath].extend(new_numbers)
+                self.parsed_counts[filepath] = seen + len(new_numbers)
+            
+            if self.velocity:
+                # Velocity: un número de cada formato por intervalo; mientras tanto las colas se llenan
+                while any(self.pending.values()):
+                    with self.reporter.capture():
+                        self._aggregate_step(batch, limit=1)
+                    await asyncio.sleep(self.poll_interval)
+            else:
+                with self.reporter.capture():
+                    self._aggregate_step(batch)
+
+    async def report_stage(self):
+        """Vuelca la salida acumulada, emite los resúmenes periódicos y consulta el manifiesto"""
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            # La lectura puede estar bloqueada por las colas llenas: el total publicado se
+            # consulta aparte para que el retraso refleje lo que ha escrito el producer
+            manifest = await loop.run_in_executor(None, read_manifest, self.data_folder)
+            self._update_written_total(manifest)
+            self.reporter.flush()
+            self.reporter.maybe_summary()
+
+    def _aggregate_step(self, batch, limit=None):
+        """Agrega los registros pendientes (todos o hasta limit por archivo) y muestra el resultado"""
+        started = time.perf_counter()
+        results_by_type = {}
+        numbers_processed = 0
+        for filepath, pending in self.pending.items():
+            if not pending:
+                continue
+            take = len(pending) if limit is None else min(limit, len(pending))
+            new_numbers = [pending.popleft() for _ in range(take)]
+            first_index = self.consumed_counts[filepath]
+            self.consume_new_records(filepath, new_numbers, first_index, self.parsed_counts[filepath])
+            self.consumed_counts[filepath] += take
+            self.sums[filepath] += sum(new_numbers)
+            numbers_processed += take
+            results_by_type[Path(filepath).suffix] = {
+                'last': new_numbers[-1],
+                'sum': self.sums[filepath],
+                'count': self.consumed_counts[filepath],
+                'total_in_file': self.parsed_counts[filepath]
+            }
+        if not results_by_type:
+            return None
+        
+        errors_detected = 0
+        if self.veracity and len(results_by_type) > 1:
+            # Solo son comparables los formatos que han consumido los mismos registros
+            # (un formato con escrituras retrasadas va por detrás de los demás)
+            key = 'last' if limit == 1 else 'sum'
+            by_count = defaultdict(set)
+            for data in results_by_type.values():
+                by_count[data['count']].add(data[key])
+            if any(len(values) > 1 for values in by_count.values()):
+                errors_detected = 1
+        
+        now = time.perf_counter()
+        aggregate_ms = (now - started) * 1000
+        processing_time = batch['read_ms'] + batch['parse_ms'] + aggregate_ms
+        latency = (now - batch['started']) * 1000
+        batch['read_ms'] = batch['parse_ms'] = 0.0  # Solo se cuentan en el primer paso del lote
+        self.processed_count = max(self.consumed_counts.values())
+        numbers_in_file = max([self.written_total] + list(self.parsed_counts.values()))
+        depths = {queue.name: queue.sample() for queue in (self.read_queue, self.parsed_queue)}
+        
+        print(f"\n⏱️  Tiempo de procesamiento: {processing_time:.2f} ms "
+              f"(agregación {aggregate_ms:.2f} ms) | Latencia: {latency:.2f} ms")
+        for file_type, data in results_by_type.items():
+            print(f"   {file_type}: Suma={data['sum']}, Números={data['count']}, "
+                  f"Parseados={data['total_in_file']}")
+        if errors_detected:
+            print(f"⚠️  DISCREPANCIA DETECTADA: Los resultados no coinciden entre formatos")
+        print(f"📊 Total procesados hasta ahora: {self.processed_count} "
+              f"(publicados por el producer: {numbers_in_file})")
+        print("🧵 Colas: " + ", ".join(
+            f"{queue.name} {depths[queue.name]}/{queue.maxsize} (bloqueos {queue.blocked_puts}, "
+            f"{queue.total_blocked_time():.1f}s)" for queue in (self.read_queue, self.parsed_queue)))
+        
+        self.performance_data['queue_depths'].append(depths)
+        self.performance_data['latencies'].append(latency)
+        self._record_performance(processing_time, numbers_in_file, numbers_processed,
+                                 self.processed_count, errors_detected)
+        return processing_time
+
+    # --- Ejecución --------------------------------------------------------
+
+    async def _run_pipeline(self):
+        self.read_queue = MonitoredQueue('lectura→parseo', self.queue_size)
+        self.parsed_queue = MonitoredQueue('parseo→agregación', self.queue_size)
+        if self.parser_executor == 'process':
+            self.executor = ProcessPoolExecutor(self.parser_workers, initializer=_ignore_sigint)
+        else:
+            self.executor = ThreadPoolExecutor(self.parser_workers)
+        try:
+            await asyncio.gather(self.read_stage(), self.parse_stage(), self.aggregate_stage(),
+                                 self.report_stage())
+        finally:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+
+    def run(self):
+        """Ejecuta el pipeline hasta Ctrl+C"""
+        self.print_configuration()
+        print(f"   Pipeline asyncio: colas de {self.queue_size} lotes, "
+              f"{self.parser_workers} {'procesos' if self.parser_executor == 'process' else 'hilos'} de parseo")
+        print("-" * 50)
+        try:
+            asyncio.run(self._run_pipeline())
+        except KeyboardInterrupt:
+            self.shutdown(len(self.performance_data['iterations']))
+
+    # --- Gráfica y estadísticas -------------------------------------------
+
+    def _extra_chart_panels(self):
+        return super()._extra_chart_panels() + [self._draw_queue_panel]
+
+    def _draw_queue_panel(self, ax):
+        """Panel del pipeline: profundidad de cada cola por iteración"""
+        queue_depths = self.performance_data['queue_depths']
+        x = range(len(queue_depths))
+        for queue in (self.read_queue, self.parsed_queue):
+            ax.step(x, [depths.get(queue.name, 0) for depths in queue_depths], where='mid',
+                    linewidth=2, label=queue.name)
+        ax.axhline(y=self.queue_size, color='red', linestyle='--', alpha=0.7, label='Capacidad')
+        ax.set_title('Pipeline: Profundidad de las Colas', fontsize=14, fontweight='bold')
+        ax.set_xlabel('Iteración')
+        ax.set_ylabel('Lotes en cola')
+        ax.legend()
+        ax.grid(True, alpha=0.3)
+        ax.set_facecolor('#eef7f7')
+
+    def print_final_statistics(self):
+        super().print_final_statistics()
+        if not self.performance_data['latencies'] or self.read_queue is None:
+            return
+        latencies = self.performance_data['latencies']
+        print(f"   Latencia lectura→agregación: p50={percentile(latencies, 50):.2f} ms, "
+              f"p95={percentile(latencies, 95):.2f} ms, p99={percentile(latencies, 99):.2f} ms")
+        for queue in (self.read_queue, self.parsed_queue):
+            metrics = queue.metrics()
+            print(f"   Cola {queue.name}: profundidad media {metrics['mean_depth']:.1f}, "
+                  f"máxima {metrics['max_depth']}/{metrics['maxsize']}, "
+                  f"{metrics['blocked_puts']} bloqueos de {metrics['puts']} envíos "
+                  f"({metrics['blocked_time']:.1f}s de backpressure)")
+
+
+def main():
+    parser = build_parser("Consumer en pipeline asyncio para Big Data")
+    parser.add_argument("--queue-size", type=int, default=4,
+                        help="Lotes que caben en cada cola antes de bloquear la etapa anterior")
+    parser.add_argument("--parser-workers", type=int, default=2,
+                        help="Hilos o procesos del pool de parseo")
+    parser.add_argument("--parser-executor", type=str, default="thread", choices=list(EXECUTORS),
+                        help="Parsear en hilos o en procesos")
+    args = parser.parse_args()
+    
+    # El pipeline no implementa las extensiones que dependen del bucle secuencial
+    unsupported = [name for name, enabled in (
+        ("--partitions", args.partitions != "none"),
+        ("--load-shedding", args.load_shedding.lower() == "true"),
+        ("--profile", args.profile.lower() == "true")) if enabled]
+    if unsupported:
+        print(f"❌ Error: {', '.join(unsupported)} no está disponible en el consumer asyncio")
+        sys.exit(1)
+    if args.queue_size < 1 or args.parser_workers < 1:
+        print("❌ Error: --queue-size y --parser-workers deben ser al menos 1")
+        sys.exit(1)
+    
+    consumer = AsyncPipelineConsumer(**consumer_arguments(args), queue_size=args.queue_size,
+                                     parser_workers=args.parser_workers,
+                                     parser_executor=args.parser_executor)
+    consumer.run()
+
+if __name__ == "__main__":
+    main()
@@ -26,7 +26,14 @@ def clean_data_folder():
     
     print("🧹 Carpeta data limpiada")
 
-def run_exercise(velocity=False, volume=False, variety=False, veracity=False):
+def run_exercise(velocity=False, volume=False, variety=False, veracity=False,
+                 window="none", window_by="count", window_size=10, window_slide=None,
+                 load_shedding=False, shed_threshold=50, recover_threshold=10, sample_size=100,
+                 sketches=False, sketch_benchmark=False, producers=1, partition_mode="merge",
+                 merge_key="timestamp", workload=None, capacity=False, profile=False,
+                 profile_snapshot="none",
+                 consumer_mode="sequential", parser_executor="thread",
+                 verbosity="verbose", summary_interval=None):
     """Ejecuta el ejercicio según los parámetros seleccionados"""
     
     # Limpiar carpeta data
@@ -36,7 +43,8 @@ def run_exercise(velocity=False, volume=False, variety=False, veracity=False):
     # Usar python si estamos en un entorno virtual, sino python3
     python_cmd = "python" if hasattr(sys, 'real_prefix') or (hasattr(sys, 'base_prefix') and sys.base_prefix != sys.prefix) else "python3"
     producer_args = [python_cmd, "producer.py"]
-    consumer_args = [python_cmd, "consumer.py"]
+    consumer_script = "async_consumer.py" if consumer_mode == "async" else "consumer.py"
+    consumer_args = [python_cmd, consumer_script]
     
     if velocity:
         producer_args.extend(["--velocity", "true"])
@@ -54,19 +62,102 @@ def run_exercise(velocity=False, volume=False, variety=False, veracity=False):
         producer_args.extend(["--veracity", "true"])
         consumer_args.extend(["--veracity", "true"])
     
+    # Perfil de carga declarativo para el/los producer(s)
+    if workload:
+        producer_args.extend(["--workload", workload])
+    
+    # Varios producers: cada uno escribe su propia partición
+    if producers > 1:
+        consumer_args.extend(["--partitions", partition_mode, "--merge-key", merge_key,
+                              "--expected-partitions", str(producers)])
+    
+    # Ventanas de agregación en el consumer
+    if window != "none":
+        consumer_args.extend(["--window", window, "--window-by", window_by,
+                              "--window-size", str(window_size)])
+        if window_slide is not None:
+            consumer_args.extend(["--window-slide", str(window_slide)])
+    
+    # Load shedding en el consumer (modo degradado con muestreo)
+    if load_shedding:
+        consumer_args.extend(["--load-shedding", "true",
+                              "--shed-threshold", str(shed_threshold),
+                              "--recover-threshold", str(recover_threshold),
+                              "--sample-size", str(sample_size)])
+    
+    # Sketches probabilísticos en el consumer
+    if sketches:
+        consumer_args.extend(["--sketches", "true"])
+        if sketch_benchmark:
+            consumer_args.extend(["--sketch-benchmark", "true"])
+    
+    # Modelo de capacidad en el consumer
+    if capacity:
+        consumer_args.extend(["--capacity", "true"])
+    
+    # Perfilado por etapas en el consumer
+    if profile:
+        consumer_args.extend(["--profile", "true", "--profile-snapshot", profile_snapshot])
+    
+    # Consumer en pipeline asyncio
+    if consumer_mode == "async":
+        consumer_args.extend(["--parser-executor", parser_executor])
+    
+    # Salida por consola de producer y consumer (verbosidad y resúmenes JSON)
+    for process_args in [producer_args, consumer_args]:
+        process_args.extend(["--verbosity", verbosity])
+        if summary_interval is not None:
+            process_args.extend(["--summary-interval", str(summary_interval)])
+    
     print(f"🚀 Iniciando ejercicio Big Data...")
     print(f"   Velocity: {velocity}")
     print(f"   Volume: {volume}")
     print(f"   Variety: {variety}")
     print(f"   Veracity: {veracity}")
+    if window != "none":
+        print(f"   Ventanas: {window} ({window_by}, tamaño {window_size:g})")
+    if load_shedding:
+        print(f"   Load shedding: umbral {shed_threshold}, recuperación {recover_threshold}")
+    if sketches:
+        print(f"   Sketches: activados{' (con benchmark exacto)' if sketch_benchmark else ''}")
+    if producers > 1:
+        print(f"   Producers: {producers} (particiones, modo {partition_mode})")
+    if workload:
+        print(f"   Perfil de carga: {workload}")
+    if capacity:
+        print(f"   Modelo de capacidad: activado")
+    if profile:
+        print(f"   Perfilado: por etapas (instantáneas: {profile_snapshot})")
+    if consumer_mode == "async":
+        print(f"   Consumer: pipeline asyncio (parseo en {parser_executor})")
+    if verbosity != "verbose":
+        print(f"   Salida: {verbosity} (resúmenes JSON periódicos)")
     print("-" * 50)
     
-    # Iniciar producer en background
-    producer_process = subprocess.Popen(
-        producer_args,
-        stdout=subprocess.DEVNULL,
-        stderr=subprocess.DEVNULL
-    )
+    # Iniciar producer(s) en background
+    if producers > 1:
+        producer_commands = [producer_args + ["--producer-id", str(producer_id)]
+                             for producer_id in range(producers)]
+    else:
+        producer_commands = [producer_args]
+    # Con resúmenes JSON la salida de cada producer se guarda en su propio log
+    # (producer.log o producer-<id>.log); si no, se descarta como siempre
+    producer_logs = []
+    if verbosity != "verbose" or summary_interval:
+        if producers > 1:
+            log_names = [f"producer-{producer_id}.log" for producer_id in range(producers)]
+        else:
+            log_names = ["producer.log"]
+        producer_logs = [open(name, 'w') for name in log_names]
+        print(f"📝 Salida del producer en: {', '.join(log.name for log in producer_logs)}")
+    producer_processes = [
+        subprocess.Popen(
+            command,
+            stdout=producer_logs[index] if producer_logs else subprocess.DEVNULL,
+            stderr=subprocess.STDOUT if producer_logs else subprocess.DEVNULL
+        )
+        for index, command in enumerate(producer_commands)
+    ]
     
     # Dar tiempo al producer para que empiece
     time.sleep(1)
@@ -90,9 +181,13 @@ def run_exercise(velocity=False, volume=False, variety=False, veracity=False):
         except subprocess.TimeoutExpired:
             consumer_process.terminate()
     finally:
-        # Terminar producer
-        producer_process.terminate()
-        producer_process.wait()
+        # Terminar producer(s)
+        for producer_process in producer_processes:
+            producer_process.terminate()
+        for producer_process in producer_processes:
+            producer_process.wait()
+        for log in producer_logs:
+            log.close()
         print("\n✅ Ejercicio completado")
 
 def main():
@@ -105,6 +200,53 @@ def main():
                        help="Activar prueba de variedad")
     parser.add_argument("--veracity", type=str, default="false",
                        help="Activar prueba de veracidad")
+    parser.add_argument("--window", type=str, default="none",
+                       choices=["none", "tumbling", "sliding"],
+                       help="Ventanas de agregación en el consumer")
+    parser.add_argument("--window-by", type=str, default="count", choices=["count", "time"],
+                       help="Ventanas por número de registros o por timestamp del producer")
+    parser.add_argument("--window-size", type=float, default=10,
+                       help="Tamaño de la ventana (registros o segundos)")
+    parser.add_argument("--window-slide", type=float, default=None,
+                       help="Desplazamiento de la ventana sliding")
+    parser.add_argument("--load-shedding", type=str, default="false",
+                       help="Activar modo degradado con muestreo ante retraso excesivo")
+    parser.add_argument("--shed-threshold", type=int, default=50,
+                       help="Retraso que activa el modo degradado")
+    parser.add_argument("--recover-threshold", type=int, default=10,
+                       help="Retraso por debajo del cual se vuelve al modo exacto")
+    parser.add_argument("--sample-size", type=int, default=100,
+                       help="Tamaño de la muestra por formato en modo degradado")
+    parser.add_argument("--sketches", type=str, default="false",
+                       help="Activar sketches probabilísticos en el consumer")
+    parser.add_argument("--sketch-benchmark", type=str, default="false",
+                       help="Comparar los sketches con los resultados exactos (memoria sin acotar)")
+    parser.add_argument("--producers", type=int, default=1,
+                       help="Número de producers concurrentes (cada uno con su partición)")
+    parser.add_argument("--partition-mode", type=str, default="merge",
+                       choices=["merge", "independent"],
+                       help="Consumir las particiones con merge ordenado o de forma independiente")
+    parser.add_argument("--merge-key", type=str, default="timestamp", choices=["timestamp", "seq"],
+                       help="Clave del merge ordenado entre particiones")
+    parser.add_argument("--workload", type=str, default=None,
+                       help="Perfil de carga para el producer (JSON o TOML, ver workloads/)")
+    parser.add_argument("--capacity", type=str, default="false",
+                       help="Predecir la saturación y recomendar consumers o tamaño de lote")
+    parser.add_argument("--profile", type=str, default="false",
+                       help="Medir el tiempo de cada etapa del consumer")
+    parser.add_argument("--profile-snapshot", type=str, default="none",
+                       choices=["none", "cprofile", "tracemalloc"],
+                       help="Instantáneas periódicas de cProfile o tracemalloc en profiles/")
+    parser.add_argument("--consumer-mode", type=str, default="sequential",
+                       choices=["sequential", "async"],
+                       help="Consumer secuencial o en pipeline asyncio (lectura, parseo y agregación solapados)")
+    parser.add_argument("--parser-executor", type=str, default="thread", choices=["thread", "process"],
+                       help="Pool de parseo del consumer asyncio")
+    parser.add_argument("--verbosity", type=str, default="verbose",
+                       choices=["quiet", "normal", "verbose"],
+                       help="Salida de producer y consumer: completa, acumulada y limitada, o solo resúmenes")
+    parser.add_argument("--summary-interval", type=float, default=None,
+                       help="Segundos entre resúmenes JSON (por defecto 10, o ninguno con verbose)")
     
     args = parser.parse_args()
     
@@ -113,13 +255,44 @@ def main():
     volume = args.volume.lower() == "true"
     variety = args.variety.lower() == "true"
     veracity = args.veracity.lower() == "true"
+    load_shedding = args.load_shedding.lower() == "true"
+    sketches = args.sketches.lower() == "true"
+    sketch_benchmark = args.sketch_benchmark.lower() == "true"
+    capacity = args.capacity.lower() == "true"
+    profile = args.profile.lower() == "true"
     
     # Verificar que al menos una V esté activada
     if not any([velocity, volume, variety, veracity]):
         print("❌ Error: Debes activar al menos una de las 4 Vs del Big Data")
         sys.exit(1)
     
-    run_exercise(velocity, volume, variety, veracity)
+    if args.producers < 1:
+        print("❌ Error: Debe haber al menos un producer")
+        sys.exit(1)
+    
+    if load_shedding and not velocity:
+        print("❌ Error: El load shedding necesita velocity (depende del retraso del consumer)")
+        sys.exit(1)
+    
+    if args.producers > 1 and (load_shedding or variety):
+        print("❌ Error: Con varios producers no se admiten load shedding ni variety")
+        sys.exit(1)
+    
+    if args.consumer_mode == "async" and (args.producers > 1 or load_shedding or profile):
+        print("❌ Error: El consumer asyncio no admite varios producers, load shedding ni perfilado")
+        sys.exit(1)
+    
+    if args.workload and not Path(args.workload).is_file():
+        print(f"❌ Error: No existe el perfil de carga {args.workload}")
+        sys.exit(1)
+    
+    run_exercise(velocity, volume, variety, veracity,
+                 args.window, args.window_by, args.window_size, args.window_slide,
+                 load_shedding, args.shed_threshold, args.recover_threshold, args.sample_size,
+                 sketches, sketch_benchmark, args.producers, args.partition_mode, args.merge_key,
+                 args.workload, capacity, profile, args.profile_snapshot,
+                 args.consumer_mode, args.parser_executor,
+                 args.verbosity, args.summary_interval)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Modelo de capacidad online para el consumer
+Estima la tasa de llegada (λ) y la tasa de servicio (μ) con medias móviles
+exponenciales (EWMA) y, con fórmulas sencillas de colas, predice la saturación
+(Tasa_Producción > Tasa_Consumo), el retraso estable y la capacidad necesaria.
+"""
+
+import math
+from collections import deque
+
+
+class EWMA:
+    """Media móvil exponencial"""
+
+    def __init__(self, alpha=0.3):
+        self.alpha = alpha
+        self.value = None
+
+    def update(self, sample):
+        if self.value is None:
+            self.value = sample
+        else:
+            self.value = self.alpha * sample + (1 - self.alpha) * self.value
+        return self.value
+
+
+def linear_slope(points):
+    """Pendiente por mínimos cuadrados de una lista de puntos (x, y)"""
+    n = len(points)
+    if n < 2:
+        return 0.0
+    mean_x = sum(x for x, _ in points) / n
+    mean_y = sum(y for _, y in points) / n
+    var_x = sum((x - mean_x) ** 2 for x, _ in points)
+    if var_x == 0:
+        return 0.0
+    return sum((x - mean_x) * (y - mean_y) for x, y in points) / var_x
+
+
+class CapacityModel:
+    """Estimador online de λ, μ y utilización del consumer.
+
+    - λ: números que llegan por segundo (crecimiento de los archivos)
+    - μ: números que el consumer puede servir por segundo con su configuración
+      actual, μ = b / (T + b·c), con b números por iteración, T el intervalo de
+      lectura y c el coste de procesamiento por número
+    """
+
+    def __init__(self, poll_interval=1.0, alpha=0.3, window=10, target_utilization=0.8):
+        self.poll_interval = poll_interval
+        self.target_utilization = target_utilization
+        self.arrival = EWMA(alpha)
+        self.batch = EWMA(alpha)
+        self.cost = EWMA(alpha)
+        self.arrival_history = deque(maxlen=window)  # (t, λ) para la tendencia
+        self._last = None  # (t, números en archivo)
+
+    def update(self, now, numbers_in_file, numbers_processed, processing_time_ms):
+        """Incorpora una iteración del consumer"""
+        if self._last is not None:
+            last_time, last_in_file = self._last
+            elapsed = now - last_time
+            if elapsed > 0:
+                rate = max(numbers_in_file - last_in_file, 0) / elapsed
+                self.arrival.update(rate)
+                self.arrival_history.append((now, self.arrival.value))
+        self._last = (now, numbers_in_file)
+
+        if numbers_processed > 0:
+            self.batch.update(numbers_processed)
+            self.cost.update(processing_time_ms / 1000 / numbers_processed)
+
+    @property
+    def arrival_rate(self):
+        return self.arrival.value or 0.0
+
+    @property
+    def service_rate(self):
+        if self.batch.value is None:
+            return 0.0
+        return self.batch.value / (self.poll_interval + self.batch.value * self.cost.value)
+
+    @property
+    def utilization(self):
+        """ρ = λ / μ (saturación cuando ρ >= 1)"""
+        if self.service_rate == 0:
+            return 0.0
+        return self.arrival_rate / self.service_rate
+
+    def steady_state_lag(self):
+        """Retraso medio estable (M/M/1: L = ρ / (1 - ρ)); None si el sistema está saturado"""
+        rho = self.utilization
+        if rho >= 1:
+            return None
+        return rho / (1 - rho)
+
+    def lag_growth(self):
+        """Números de retraso que se acumulan por segundo cuando λ > μ"""
+        return max(self.arrival_rate - self.service_rate, 0.0)
+
+    def time_to_saturation(self):
+        """Segundos hasta que λ alcance μ según la tendencia actual.
+
+        0 si ya está saturado y None si λ no está creciendo.
+        """
+        if self.utilization >= 1:
+            return 0.0
+        slope = linear_slope(list(self.arrival_history))
+        if slope <= 0:
+            return None
+        return (self.service_rate - self.arrival_rate) / slope
+
+    def recommended_consumers(self):
+        """Consumers en paralelo para trabajar a la utilización objetivo"""
+        if self.service_rate == 0:
+            return 1
+        return max(1, math.ceil(self.arrival_rate / (self.service_rate * self.target_utilization)))
+
+    def recommended_batch_size(self):
+        """Números por iteración para que un único consumer no se sature.
+
+        b / (T + b·c) >= λ / objetivo  =>  b >= λ·T / (objetivo - λ·c).
+        None si el coste por número lo impide (hacen falta más consumers).
+        """
+        target_rate = self.arrival_rate / self.target_utilization
+        cost = self.cost.value or 0.0
+        if target_rate * cost >= 1:
+            return None
+        return max(1, math.ceil(target_rate * self.poll_interval / (1 - target_rate * cost)))
+
+    def summary(self):
+        """Resumen del modelo en un diccionario"""
+        return {
+            'arrival_rate': self.arrival_rate,
+            'service_rate': self.service_rate,
+            'utilization': self.utilization,
+            'steady_state_lag': self.steady_state_lag(),
+            'lag_growth': self.lag_growth(),
+            'time_to_saturation': self.time_to_saturation(),
+            'recommended_consumers': self.recommended_consumers(),
+            'recommended_batch_size': self.recommended_batch_size()
+        }
@@ -9,13 +9,21 @@ import time
 import json
 import csv
 import glob
+import sys
 from pathlib import Path
-from collections import defaultdict
+from collections import defaultdict, deque
+from windows import WindowAggregator
+from sampling import ReservoirSampler, estimate_total, estimate_count
+from sketches import StreamSummary
+from capacity import CapacityModel
+from profiling import StageProfiler, STAGES, STAGE_LABELS
+from reporting import Reporter
+from partitions import PARTITION_PATTERN, PartitionReader, OrderedMerger
+from publication import read_manifest, file_signature
 try:
     import matplotlib
     matplotlib.use('Agg')  # Backend sin GUI para generar archivos
     import matplotlib.pyplot as plt
-    import numpy as np
     MATPLOTLIB_AVAILABLE = True
 except ImportError:
     MATPLOTLIB_AVAILABLE = False
@@ -23,7 +31,13 @@ except ImportError:
     print("   Instala con: pip install matplotlib seaborn numpy")
 
 class BigDataConsumer:
-    def __init__(self, velocity=False, volume=False, variety=False, veracity=False):
+    def __init__(self, velocity=False, volume=False, variety=False, veracity=False,
+                 window_type=None, window_by='count', window_size=10, window_slide=None,
+                 load_shedding=False, shed_threshold=50, recover_threshold=10, sample_size=100,
+                 sketches=False, sketch_benchmark=False, partition_mode=None, merge_key='timestamp',
+                 expected_partitions=None, capacity=False, profile=False, profile_snapshot=None,
+                 profile_every=10,
+                 verbosity='verbose', report_interval=5.0, summary_interval=None):
         self.velocity = velocity
         self.volume = volume
         self.variety = variety
@@ -31,8 +45,12 @@ class BigDataConsumer:
         self.data_folder = Path("data")
         self.output_folder = "."  # Carpeta donde se guardan las gráficas (directorio actual)
         
-        # Contador para mostrar solo cuando hay cambios significativos
-        self.last_file_sizes = {}
+        # Firmas de archivos para procesar solo cuando hay cambios significativos
+        self.last_file_signatures = {}
+        
+        # Manifiesto publicado por el producer (generación y longitud confirmada)
+        self.manifest = None
+        self.known_total = 0  # Mayor número de registros visto en un archivo
         
         # Para velocity: trackear cuántos números ya hemos procesado
         self.processed_count = 0
@@ -44,15 +62,87 @@ class BigDataConsumer:
             'numbers_in_file': [],
             'numbers_processed': [],
             'total_numbers_processed': [],
-            'veracity_errors': []
+            'veracity_errors': [],
+            'window_results': [],
+            'modes': [],
+            'estimation_errors': [],
+            'partition_counts': [],
+            'ingest_throughputs': [],
+            'timestamps': [],
+            'arrival_rates': [],
+            'service_rates': []
         }
+        
+        # Ventanas de agregación (tumbling/sliding) sobre el flujo consumido
+        self.window_type = window_type
+        self.window_by = window_by
+        self.window_size = window_size
+        self.window_slide = window_slide
+        self.windows = {}          # Un agregador por formato (.txt, .csv, .json)
+        self.window_stamps = {}    # Lotes observados por archivo: (fin_de_lote, timestamp)
+        self.pending_windows = []  # Ventanas cerradas en la iteración actual
+        
+        # Load shedding (velocity): modo degradado con muestreo cuando el retraso es excesivo
+        self.load_shedding = load_shedding
+        self.shed_threshold = shed_threshold        # Retraso que activa el modo degradado
+        self.recover_threshold = recover_threshold  # Retraso por debajo del cual se desactiva
+        self.sample_size = sample_size              # Registros procesados exactamente por formato
+        self.degraded = False
+        self.pending_estimation_error = None        # Error relativo de la estimación actual
+        self.shed_records = 0                       # Números descartados (solo estimados)
+        
+        # Sketches probabilísticos (memoria acotada) por formato; los resultados exactos
+        # (memoria sin acotar) solo se mantienen para el benchmark
+        self.sketches_enabled = sketches
+        self.sketch_benchmark = sketches and sketch_benchmark
+        self.sketches = {}
+        
+        # Registros nuevos ya consumidos por archivo (ventanas y sketches)
+        self.record_offsets = {}
+        
+        # Varios producers: particiones leídas con merge ordenado o de forma independiente
+        self.partition_mode = partition_mode
+        self.merge_key = merge_key
+        self.partition_readers = {}                      # producer_id -> PartitionReader
+        self.partition_first_ts = {}                     # producer_id -> primer timestamp leído
+        self.partition_buffers = defaultdict(deque)      # Registros pendientes (modo independiente)
+        self.partition_consumed = defaultdict(int)       # Registros consumidos por partición
+        self.merger = OrderedMerger(merge_key, expected_partitions)
+        
+        # Modelo de capacidad: tasas de llegada y de servicio, saturación y recomendaciones
+        self.poll_interval = 1.0  # Segundos entre lecturas
+        self.capacity_enabled = capacity
+        self.capacity = CapacityModel(self.poll_interval)
+        
+        # Perfilado por etapas de cada lectura (y cProfile/tracemalloc periódicos)
+        self.profiler = StageProfiler(profile, profile_snapshot, profile_every)
+        
+        # Salida por consola: verbosidad, volcados limitados y resúmenes JSON periódicos
+        self.reporter = Reporter('consumer', verbosity, report_interval, summary_interval)
+
+    def _committed_length(self, filepath):
+        """Bytes confirmados por el producer para un archivo (None si no hay manifiesto)"""
+        if not self.manifest:
+            return None
+        return self.manifest.get('files', {}).get(Path(filepath).name)
+
+    def read_committed_text(self, filepath):
+        """Lee solo la parte confirmada de un archivo de texto (sin líneas a medio escribir)"""
+        limit = self._committed_length(filepath)
+        with open(filepath, 'rb') as f:
+            data = f.read() if limit is None else f.read(limit)
+        # Sin manifiesto: descartar una posible última línea incompleta
+        end = data.rfind(b'\n')
+        return data[:end + 1].decode() if end >= 0 else ''
 
     def read_txt_file(self, filepath):
         """Lee números de un archivo TXT"""
         numbers = []
         try:
-            with open(filepath, 'r') as f:
-                for line in f:
+            with self.profiler.stage('read'):
+                text = self.read_committed_text(filepath)
+            with self.profiler.stage('parse'):
+                for line in text.splitlines():
                     line = line.strip()
                     if line:
                         numbers.append(int(line))
@@ -64,8 +154,10 @@ class BigDataConsumer:
         """Lee números de un archivo CSV"""
         numbers = []
         try:
-            with open(filepath, 'r') as f:
-                reader = csv.reader(f)
+            with self.profiler.stage('read'):
+                text = self.read_committed_text(filepath)
+            with self.profiler.stage('parse'):
+                reader = csv.reader(text.splitlines())
                 next(reader, None)  # Skip header
                 for row in reader:
                     if row:
@@ -75,13 +167,19 @@ class BigDataConsumer:
         return numbers
 
     def read_json_file(self, filepath):
-        """Lee números de un archivo JSON"""
+        """Lee números de un archivo JSON (el producer lo publica de forma atómica)"""
         numbers = []
         try:
-            with open(filepath, 'r') as f:
-                data = json.load(f)
+            with self.profiler.stage('read'):
+                with open(filepath, 'r') as f:
+                    text = f.read()
+            with self.profiler.stage('parse'):
+                data = json.loads(text)
                 if 'numbers' in data:
                     numbers = data['numbers']
+            # Recortar a la generación confirmada para que coincida con el resto de formatos
+            if self.manifest and self.manifest.get('records') is not None:
+                numbers = numbers[:self.manifest['records']]
         except (json.JSONDecodeError, FileNotFoundError, KeyError):
             pass
         return numbers
@@ -99,9 +197,14 @@ class BigDataConsumer:
         
         return []
 
-    def get_next_number_for_velocity(self, filepath):
-        """Para velocity: obtiene solo el siguiente número no procesado"""
-        numbers = self.get_file_numbers(filepath)
+    def get_next_number_for_velocity(self, filepath, numbers=None):
+        """Para velocity: obtiene solo el siguiente número no procesado.
+        
+        numbers permite reutilizar el contenido ya leído en esta iteración.
+        """
+        if numbers is None:
+            numbers = self.get_file_numbers(filepath)
+        self.known_total = max(self.known_total, len(numbers))
         
         # Si hay números nuevos más allá de los ya procesados
         if len(numbers) > self.processed_count:
@@ -112,6 +215,366 @@ class BigDataConsumer:
         
         return [], len(numbers)  # Sin números nuevos
 
+    def _stamp_new_records(self, filepath, total_in_file):
+        """Asigna a los registros nuevos el timestamp del lote en que los generó el producer.
+        
+        Los lotes (fin en la secuencia, timestamp) vienen del manifiesto. Sin manifiesto
+        se usa el mtime del archivo, que agrupa todos los lotes escritos entre dos lecturas.
+        """
+        stamps = self.window_stamps.setdefault(filepath, deque())
+        last_total = stamps[-1][0] if stamps else self.record_offsets.get(filepath, 0)
+        if total_in_file <= last_total:
+            return
+        batches = self.manifest.get('batches') if self.manifest else None
+        if batches:
+            stamps.extend((end, ts) for end, ts in batches if end > last_total)
+        else:
+            try:
+                ts = Path(filepath).stat().st_mtime
+            except OSError:
+                ts = time.time()
+            stamps.append((total_in_file, ts))
+
+    def _record_timestamp(self, filepath, index):
+        """Timestamp del lote al que pertenece el registro (descarta lotes ya consumidos)"""
+        stamps = self.window_stamps.get(filepath)
+        while stamps and stamps[0][0] <= index:
+            stamps.popleft()
+        return stamps[0][1] if stamps else time.time()
+
+    def _stream_name(self, filepath):
+        """Nombre del flujo de un archivo: su formato o la partición del producer"""
+        path = Path(filepath)
+        if path.name.startswith('partition-'):
+            return f"P{path.stem.split('-', 1)[1]}"
+        return path.suffix
+
+    def update_windows(self, filepath, new_numbers, first_index, total_in_file,
+                       timestamps=None, stream=None):
+        """Alimenta las ventanas con registros nuevos de un archivo"""
+        file_type = stream or self._stream_name(filepath)
+        if file_type not in self.windows:
+            self.windows[file_type] = WindowAggregator(self.window_type, self.window_by,
+                                                       self.window_size, self.window_slide)
+        aggregator = self.windows[file_type]
+        
+        if timestamps is None:
+            self._stamp_new_records(filepath, total_in_file)
+        for offset, value in enumerate(new_numbers):
+            index = first_index + offset
+            # La secuencia del producer empieza en 1: cualquier otro valor es un error
+            is_error = value != index + 1
+            if timestamps is None:
+                ts = self._record_timestamp(filepath, index)
+            else:
+                ts = timestamps[offset]
+            for result in aggregator.add(value, ts, is_error):
+                result['format'] = file_type
+                self.pending_windows.append(result)
+
+    def update_sketches(self, filepath, new_numbers, first_index):
+        """Alimenta los sketches del formato con registros nuevos de un archivo"""
+        file_type = self._stream_name(filepath)
+        if file_type not in self.sketches:
+            self.sketches[file_type] = StreamSummary(exact=self.sketch_benchmark)
+        summary = self.sketches[file_type]
+        for offset, value in enumerate(new_numbers):
+            summary.add(value, first_index + offset + 1)
+
+    def consume_new_records(self, filepath, new_numbers, first_index, total_in_file,
+                            timestamps=None, stream=None):
+        """Pasa los registros nuevos de un archivo a las ventanas y a los sketches"""
+        with self.profiler.stage('aggregate'):
+            if self.window_type:
+                self.update_windows(filepath, new_numbers, first_index, total_in_file,
+                                    timestamps, stream)
+            if self.sketches_enabled:
+                self.update_sketches(filepath, new_numbers, first_index)
+        self.record_offsets[filepath] = first_index + len(new_numbers)
+
+    def consume_new_records_from_file(self, filepath, numbers):
+        """Pasa solo los números que no se habían visto del archivo"""
+        if not (self.window_type or self.sketches_enabled):
+            return
+        offset = self.record_offsets.get(filepath, 0)
+        if len(numbers) > offset:
+            self.consume_new_records(filepath, numbers[offset:], offset, len(numbers))
+
+    def _print_window_results(self, results):
+        """Muestra las ventanas cerradas en la iteración"""
+        for result in results:
+            if self.window_by == 'time':
+                start = time.strftime('%H:%M:%S', time.localtime(result['start']))
+                end = time.strftime('%H:%M:%S', time.localtime(result['end']))
+            else:
+                start, end = result['start'], result['end']
+            print(f"🪟 Ventana {result['format']} [{start}, {end}): "
+                  f"n={result['count']}, Suma={result['sum']}, "
+                  f"Min={result['min']}, Max={result['max']}, "
+                  f"Media={result['mean']:.2f}, Errores={result['error_rate']:.1%}")
+
+    def find_partition_files(self):
+        """Encuentra los archivos de partición de los producers"""
+        partitions = {}
+        for filepath in sorted(glob.glob(str(self.data_folder / PARTITION_PATTERN))):
+            try:
+                producer_id = int(Path(filepath).stem.split('-', 1)[1])
+            except ValueError:
+                continue
+            partitions[producer_id] = filepath
+        return partitions
+
+    def _partition_ingest_stats(self):
+        """Throughput de ingesta agregado y skew entre particiones"""
+        counts = {pid: reader.records_read for pid, reader in self.partition_readers.items()}
+        rates = {}
+        for pid, reader in self.partition_readers.items():
+            first_ts = self.partition_first_ts.get(pid)
+            if first_ts is not None and reader.last_timestamp is not None:
+                rates[pid] = reader.records_read / max(reader.last_timestamp - first_ts, 1.0)
+        throughput = sum(rates.values())
+        mean_count = sum(counts.values()) / len(counts) if counts else 0
+        skew = max(counts.values()) / mean_count if mean_count else 1.0
+        return counts, rates, throughput, skew
+
+    def process_partitions(self, start_time):
+        """Procesa las particiones de varios producers (merge ordenado o independiente)"""
+        with self.profiler.stage('discovery'):
+            partitions = self.find_partition_files()
+        if not partitions:
+            return None
+        
+        # Lectura incremental de cada partición (solo líneas completas)
+        for producer_id, filepath in partitions.items():
+            if producer_id not in self.partition_readers:
+                self.partition_readers[producer_id] = PartitionReader(filepath)
+            with self.profiler.stage('stat'):
+                manifest = read_manifest(self.data_folder, producer_id)
+            committed = manifest.get('files', {}).get(Path(filepath).name) if manifest else None
+            with self.profiler.stage('read'):
+                records = self.partition_readers[producer_id].read_new_records(committed)
+            if records and producer_id not in self.partition_first_ts:
+                self.partition_first_ts[producer_id] = records[0][2]
+            if self.partition_mode == 'merge':
+                self.merger.add(producer_id, records)
+            else:
+                self.partition_buffers[producer_id].extend(records)
+        
+        # Velocity: un único registro por iteración (por partición en modo independiente)
+        limit = 1 if self.velocity else None
+        with self.profiler.stage('aggregate'):
+            if self.partition_mode == 'merge':
+                batch = self.merger.pop_ready(limit)
+            else:
+                batch = []
+                for buffer in self.partition_buffers.values():
+                    take = len(buffer) if limit is None else min(limit, len(buffer))
+                    batch.extend(buffer.popleft() for _ in range(take))
+        
+        if not batch:
+            if self.partition_mode == 'merge' and self.merger.waiting_partitions():
+                print(f"   ⏳ Merge en espera: faltan {self.merger.waiting_partitions()} partición(es) "
+                      f"de {self.merger.expected}")
+            return None
+        
+        # Agregación por partición
+        results_by_partition = defaultdict(lambda: {'sum': 0, 'count': 0, 'errors': 0})
+        stream = 'merge' if self.partition_mode == 'merge' else None
+        with self.profiler.stage('aggregate'):
+            for producer_id, seq, timestamp, number in batch:
+                results = results_by_partition[producer_id]
+                results['sum'] += number
+                results['count'] += 1
+                if number != seq:
+                    results['errors'] += 1
+                self.partition_consumed[producer_id] += 1
+                self.consume_new_records(partitions[producer_id], [number], seq - 1,
+                                         seq, [timestamp], stream)
+        self.processed_count += len(batch)
+        
+        end_time = time.time()
+        processing_time = (end_time - start_time) * 1000
+        
+        counts, rates, throughput, skew = self._partition_ingest_stats()
+        total_written = sum(counts.values())
+        
+        print(f"\n⏱️  Tiempo de procesamiento: {processing_time:.2f} ms")
+        if self.partition_mode == 'merge':
+            print(f"🧩 Particiones: {len(partitions)} (merge ordenado por {self.merge_key}, "
+                  f"{self.merger.pending()} en espera)")
+        else:
+            print(f"🧩 Particiones: {len(partitions)} (consumo independiente)")
+        for producer_id in sorted(counts):
+            results = results_by_partition.get(producer_id, {'sum': 0, 'count': 0})
+            print(f"   P{producer_id}: Escritos={counts[producer_id]}, "
+                  f"Consumidos={self.partition_consumed[producer_id]}, "
+                  f"Suma lote={results['sum']}, "
+                  f"Ingesta={rates.get(producer_id, 0):.1f} números/s")
+        print(f"🚀 Ingesta agregada: {throughput:.1f} números/s | Skew: {skew:.2f} (máx/media)")
+        print(f"📊 Total procesados hasta ahora: {self.processed_count}")
+        
+        # Detectar errores si veracity está activo (número distinto de su secuencia)
+        errors_detected = 0
+        if self.veracity:
+            with self.profiler.stage('veracity'):
+                errors_detected = sum(results['errors'] for results in results_by_partition.values())
+            if errors_detected:
+                print(f"⚠️  {errors_detected} números no coinciden con su secuencia")
+        
+        # Recopilar datos para gráfica (particiones)
+        self.performance_data['partition_counts'].append(counts)
+        self.performance_data['ingest_throughputs'].append(throughput)
+        self._record_performance(processing_time, total_written, len(batch),
+                                 self.processed_count, errors_detected)
+        
+        return processing_time
+
+    def _update_shedding_mode(self, lag):
+        """Activa o desactiva el modo degradado según el retraso (con histéresis)"""
+        if not self.degraded and lag > self.shed_threshold:
+            self.degraded = True
+            print(f"🚦 Retraso de {lag} números > {self.shed_threshold}: activando modo degradado")
+        elif self.degraded and lag <= self.recover_threshold:
+            self.degraded = False
+            print(f"🟢 Retraso de {lag} números <= {self.recover_threshold}: volviendo a modo exacto")
+
+    def process_degraded(self, file_numbers, start_time):
+        """Modo degradado: procesa una muestra del backlog y estima sumas y errores.
+        
+        Cada formato es un estrato con su propio reservoir; el backlog completo se
+        da por consumido para que la latencia se mantenga acotada.
+        """
+        estimates = {}
+        with self.profiler.stage('aggregate'):
+            for filepath, numbers in file_numbers.items():
+                backlog_start = min(self.processed_count, len(numbers))
+                backlog_size = len(numbers) - backlog_start
+                if backlog_size == 0:
+                    continue
+                
+                sampler = ReservoirSampler(self.sample_size)
+                sampler.extend(range(backlog_start, len(numbers)))
+                
+                # Procesamiento exacto solo de la muestra
+                values = [numbers[index] for index in sampler.sample]
+                error_flags = [numbers[index] != index + 1 for index in sampler.sample]
+                sum_estimate, sum_ci = estimate_total(values, backlog_size)
+                errors_estimate, errors_ci = estimate_count(error_flags, backlog_size)
+                estimates[filepath] = {
+                    'backlog_start': backlog_start,
+                    'backlog': backlog_size,
+                    'sampled': len(values),
+                    'sum': sum_estimate,
+                    'sum_ci': sum_ci,
+                    'errors': errors_estimate,
+                    'errors_ci': errors_ci
+                }
+        
+        total_in_file = max(len(numbers) for numbers in file_numbers.values())
+        self.processed_count = total_in_file
+        
+        # Ventanas y sketches necesitan registros consecutivos: el backlog descartado no les llega
+        for filepath, numbers in file_numbers.items():
+            self.record_offsets[filepath] = len(numbers)
+        shed = sum(estimate['backlog'] for estimate in estimates.values())
+        self.shed_records += shed
+        
+        end_time = time.time()
+        processing_time = (end_time - start_time) * 1000
+        
+        print(f"\n⏱️  Tiempo de procesamiento: {processing_time:.2f} ms")
+        print(f"🚦 Modo degradado: muestra de hasta {self.sample_size} números por formato")
+        if self.window_type or self.sketches_enabled:
+            print(f"   Ventanas y sketches omiten los {shed} números del backlog descartado")
+        
+        # Error real de la estimación (fuera de la sección cronometrada)
+        relative_errors = []
+        for filepath, estimate in estimates.items():
+            exact_sum = sum(file_numbers[filepath][estimate['backlog_start']:])
+            if exact_sum:
+                relative_errors.append(abs(estimate['sum'] - exact_sum) / abs(exact_sum))
+            print(f"   {Path(filepath).suffix}: Backlog={estimate['backlog']}, "
+                  f"Muestra={estimate['sampled']}, "
+                  f"Suma≈{estimate['sum']:.0f} ± {estimate['sum_ci']:.0f} (exacta={exact_sum})")
+            if self.veracity:
+                print(f"      Errores≈{estimate['errors']:.1f} ± {estimate['errors_ci']:.1f}")
+        
+        estimation_error = max(relative_errors) if relative_errors else 0.0
+        print(f"📉 Error real de estimación: {estimation_error:.2%} (intervalos al 95%)")
+        print(f"📊 Total procesados hasta ahora: {self.processed_count}")
+        
+        # Recopilar datos para gráfica (modo degradado)
+        self.pending_estimation_error = estimation_error
+        numbers_sampled = sum(estimate['sampled'] for estimate in estimates.values())
+        self._record_performance(processing_time, total_in_file, numbers_sampled,
+                                 self.processed_count, 0)
+        
+        return processing_time
+
+    def _record_performance(self, processing_time, numbers_in_file, numbers_processed,
+                            total_processed, errors_detected):
+        """Recopila los datos de la iteración para la gráfica"""
+        # Informes de la lectura: registro para la gráfica, ventanas, sketches y capacidad
+        with self.profiler.stage('report'):
+            if len(self.performance_data['iterations']) == 0:
+                iteration = 0
+            else:
+                iteration = self.performance_data['iterations'][-1] + 1
+            
+            self.performance_data['iterations'].append(iteration)
+            self.performance_data['processing_times'].append(processing_time)
+            self.performance_data['numbers_in_file'].append(numbers_in_file)
+            self.performance_data['numbers_processed'].append(numbers_processed)
+            self.performance_data['total_numbers_processed'].append(total_processed)
+            self.performance_data['veracity_errors'].append(errors_detected)
+            self.reporter.observe(numbers_processed, processing_time, numbers_in_file - total_processed)
+            self.performance_data['timestamps'].append(time.time())
+            self.performance_data['modes'].append('degradado' if self.degraded else 'exacto')
+            if self.load_shedding and not self.degraded:
+                print(f"🚦 Modo exacto (retraso: {numbers_in_file - total_processed} números)")
+            self.performance_data['estimation_errors'].append(self.pending_estimation_error or 0.0)
+            self.pending_estimation_error = None
+            
+            # Ventanas cerradas durante esta iteración
+            window_results = self.pending_windows
+            self.pending_windows = []
+            self.performance_data['window_results'].append(window_results)
+            self._print_window_results(window_results)
+            
+            if self.sketches_enabled:
+                for file_type, summary in sorted(self.sketches.items()):
+                    corrupted = sum(summary.cms.estimate(kind) for kind in StreamSummary.CORRUPTION_KINDS)
+                    print(f"🧮 Sketches {file_type}: Distintos≈{summary.hll.count():.0f}, "
+                          f"p50≈{summary.kll.quantile(0.5)}, p99≈{summary.kll.quantile(0.99)}, "
+                          f"Corruptos≈{corrupted}")
+            
+            if self.capacity_enabled:
+                self._update_capacity()
+
+    def _update_capacity(self):
+        """Actualiza el modelo de capacidad con la última iteración de performance_data"""
+        data = self.performance_data
+        self.capacity.update(data['timestamps'][-1], data['numbers_in_file'][-1],
+                             data['numbers_processed'][-1], data['processing_times'][-1])
+        data['arrival_rates'].append(self.capacity.arrival_rate)
+        data['service_rates'].append(self.capacity.service_rate)
+        print(f"📐 Capacidad: {self._format_capacity(self.capacity.summary())}")
+
+    def _format_capacity(self, summary):
+        """Resumen del modelo de capacidad en una línea"""
+        text = (f"λ={summary['arrival_rate']:.2f} números/s, μ={summary['service_rate']:.2f} números/s, "
+                f"ρ={summary['utilization']:.2f}")
+        if summary['steady_state_lag'] is not None:
+            text += f" | Retraso estable≈{summary['steady_state_lag']:.1f} números"
+        else:
+            text += f" | SATURADO: el retraso crece {summary['lag_growth']:.2f} números/s"
+        if summary['time_to_saturation'] is not None and summary['time_to_saturation'] > 0:
+            text += f" | Saturación en ≈{summary['time_to_saturation']:.0f}s"
+        batch = summary['recommended_batch_size']
+        text += f" | Recomendado: {summary['recommended_consumers']} consumer(s)"
+        text += f" o lotes de {batch} números" if batch is not None else " (el lote no basta)"
+        return text
+
     def _generate_chart_filename(self):
         """Genera el nombre del archivo basado en las V's activadas"""
         v_names = []
@@ -150,10 +613,114 @@ class BigDataConsumer:
         except Exception as e:
             print(f"⚠️  Error limpiando carpeta data: {e}")
 
+    def _extra_chart_panels(self):
+        """Lista de funciones que dibujan los paneles adicionales de la gráfica"""
+        panels = []
+        if self.window_type:
+            panels.append(self._draw_window_panel)
+        if self.load_shedding:
+            panels.append(self._draw_shedding_panel)
+        if self.partition_mode:
+            panels.append(self._draw_partition_panel)
+        if self.capacity_enabled:
+            panels.append(self._draw_capacity_panel)
+        if self.profiler.enabled:
+            panels.append(self._draw_profile_panel)
+        return panels
+
+    def _draw_profile_panel(self, ax):
+        """Panel de perfilado: tiempo apilado de cada etapa por iteración"""
+        x = range(len(self.profiler.polls))
+        bottom = [0.0] * len(self.profiler.polls)
+        for stage in STAGES:
+            series = self.profiler.stage_series(stage)
+            ax.bar(x, series, bottom=bottom, label=STAGE_LABELS[stage])
+            bottom = [b + s for b, s in zip(bottom, series)]
+        ax.set_title('Perfilado: Tiempo por Etapa', fontsize=14, fontweight='bold')
+        ax.set_xlabel('Iteración')
+        ax.set_ylabel('Tiempo (ms)')
+        ax.legend(fontsize=8, ncol=2)
+        ax.grid(True, alpha=0.3)
+        ax.set_facecolor('#fdf2f8')
+
+    def _draw_capacity_panel(self, ax):
+        """Panel de capacidad: tasa de llegada (λ) frente a tasa de servicio (μ)"""
+        arrival = self.performance_data['arrival_rates']
+        service = self.performance_data['service_rates']
+        x = range(len(arrival))
+        ax.plot(x, arrival, 'r-o', linewidth=2, markersize=3, label='Llegada λ (números/s)')
+        ax.plot(x, service, 'g-s', linewidth=2, markersize=3, label='Servicio μ (números/s)')
+        ax.fill_between(x, arrival, service, where=[a > s for a, s in zip(arrival, service)],
+                        alpha=0.2, color='red', label='Saturación (λ > μ)')
+        ax.set_title('Capacidad: Llegada vs Servicio', fontsize=14, fontweight='bold')
+        ax.set_xlabel('Iteración')
+        ax.set_ylabel('Números por segundo')
+        ax.legend()
+        ax.grid(True, alpha=0.3)
+        ax.set_facecolor('#f0f4ff')
+
+    def _draw_partition_panel(self, ax):
+        """Panel de particiones: números escritos por cada producer"""
+        partition_counts = self.performance_data['partition_counts']
+        producer_ids = sorted({pid for counts in partition_counts for pid in counts})
+        x = range(len(partition_counts))
+        for pid in producer_ids:
+            ax.plot(x, [counts.get(pid, 0) for counts in partition_counts], '-o',
+                    linewidth=2, markersize=3, label=f'P{pid}')
+        ax.set_title('Particiones: Números Escritos por Producer', fontsize=14, fontweight='bold')
+        ax.set_xlabel('Iteración')
+        ax.set_ylabel('Números escritos')
+        if producer_ids:
+            ax.legend()
+        ax.grid(True, alpha=0.3)
+        ax.set_facecolor('#e8f5e8')
+
+    def _draw_shedding_panel(self, ax):
+        """Panel de load shedding: modo activo y error de estimación por iteración"""
+        iterations = self.performance_data['iterations']
+        errors = [e * 100 for e in self.performance_data['estimation_errors']]
+        degraded = [m == 'degradado' for m in self.performance_data['modes']]
+        
+        ax.bar(iterations, errors, color='purple', alpha=0.7, label='Error de estimación (%)')
+        if any(degraded):
+            ax.fill_between(iterations, 0, 1, where=degraded, step='mid', alpha=0.15,
+                            color='red', transform=ax.get_xaxis_transform(), label='Modo degradado')
+        ax.set_title('Load Shedding: Modo y Error de Estimación', fontsize=14, fontweight='bold')
+        ax.set_xlabel('Iteración')
+        ax.set_ylabel('Error relativo (%)')
+        ax.legend()
+        ax.grid(True, alpha=0.3)
+        ax.set_facecolor('#fff3cd')
+
+    def _draw_window_panel(self, ax):
+        """Panel de ventanas: media y rango [min, max] de cada ventana cerrada"""
+        results_by_type = defaultdict(list)
+        for window_results in self.performance_data['window_results']:
+            for result in window_results:
+                results_by_type[result['format']].append(result)
+        
+        if not results_by_type:
+            ax.text(0.5, 0.5, 'No se cerró ninguna ventana',
+                    ha='center', va='center', transform=ax.transAxes, fontsize=12)
+        for file_type, results in sorted(results_by_type.items()):
+            x = range(len(results))
+            means = [r['mean'] for r in results]
+            line, = ax.plot(x, means, '-o', linewidth=2, markersize=3, label=f'Media {file_type}')
+            ax.fill_between(x, [r['min'] for r in results], [r['max'] for r in results],
+                            alpha=0.15, color=line.get_color())
+        ax.set_title(f"Ventanas {self.window_type}: Media y Rango", fontsize=14, fontweight='bold')
+        ax.set_xlabel('Ventana')
+        ax.set_ylabel('Valor')
+        if results_by_type:
+            ax.legend()
+        ax.grid(True, alpha=0.3)
+        ax.set_facecolor('#f8f9fa')
+
     def generate_performance_chart(self):
         """Genera gráfica de rendimiento al finalizar"""
         if not MATPLOTLIB_AVAILABLE:
             print("📊 Gráficas no disponibles (matplotlib no instalado)")
+            self.print_final_statistics()
             return
             
         if not self.performance_data['iterations']:
@@ -173,7 +740,11 @@ class BigDataConsumer:
                 plt.style.use('seaborn-v0_8')
             except:
                 plt.style.use('seaborn')
-            fig, ((ax1, ax2), (ax3, ax4)) = plt.subplots(2, 2, figsize=(15, 10))
+            # Paneles adicionales según las opciones activas (dos por fila)
+            extra_panels = self._extra_chart_panels()
+            rows = 2 + (len(extra_panels) + 1) // 2
+            fig, axes = plt.subplots(rows, 2, figsize=(15, 5 * rows))
+            (ax1, ax2), (ax3, ax4) = axes[0], axes[1]
         
             iterations = self.performance_data['iterations']
             times = self.performance_data['processing_times']
@@ -233,6 +804,13 @@ class BigDataConsumer:
             ax4.set_xlabel("Iteración")
             ax4.set_ylabel("Número de errores")
             
+            # Paneles adicionales
+            extra_axes = [ax for row in axes[2:] for ax in row]
+            for draw_panel, ax in zip(extra_panels, extra_axes):
+                draw_panel(ax)
+            for ax in extra_axes[len(extra_panels):]:
+                ax.set_visible(False)
+            
             plt.tight_layout()
             
             # Generar nombre de archivo basado en las Vs activadas
@@ -269,22 +847,102 @@ class BigDataConsumer:
         print(f"✅ Gráfica generada exitosamente")
         
         # Mostrar estadísticas finales
-        if self.performance_data['processing_times']:
-            times = self.performance_data['processing_times']
-            iterations = self.performance_data['iterations']
-            numbers_in_file = self.performance_data['numbers_in_file']
-            total_processed = self.performance_data['total_numbers_processed']
-            
-            print(f"\n📈 ESTADÍSTICAS FINALES:")
-            print(f"   Iteraciones totales: {len(iterations)}")
-            print(f"   Tiempo promedio: {np.mean(times):.2f} ms")
-            print(f"   Tiempo máximo: {max(times):.2f} ms")
-            print(f"   Tiempo mínimo: {min(times):.2f} ms")
-            if self.velocity and len(numbers_in_file) > 0 and len(total_processed) > 0:
-                final_delay = numbers_in_file[-1] - total_processed[-1]
-                print(f"   Retraso final: {final_delay} números")
-            if len(numbers_in_file) > 0:
-                print(f"   Volumen máximo: {max(numbers_in_file)} números")
+        self.print_final_statistics()
+
+    def print_final_statistics(self):
+        """Muestra las estadísticas finales del ejercicio"""
+        if not self.performance_data['processing_times']:
+            return
+        
+        times = self.performance_data['processing_times']
+        iterations = self.performance_data['iterations']
+        numbers_in_file = self.performance_data['numbers_in_file']
+        total_processed = self.performance_data['total_numbers_processed']
+        
+        print(f"\n📈 ESTADÍSTICAS FINALES:")
+        print(f"   Iteraciones totales: {len(iterations)}")
+        print(f"   Tiempo promedio: {sum(times) / len(times):.2f} ms")
+        print(f"   Tiempo máximo: {max(times):.2f} ms")
+        print(f"   Tiempo mínimo: {min(times):.2f} ms")
+        if self.velocity and len(numbers_in_file) > 0 and len(total_processed) > 0:
+            final_delay = numbers_in_file[-1] - total_processed[-1]
+            print(f"   Retraso final: {final_delay} números")
+        if len(numbers_in_file) > 0:
+            print(f"   Volumen máximo: {max(numbers_in_file)} números")
+        if self.load_shedding:
+            modes = self.performance_data['modes']
+            degraded_errors = [e for m, e in zip(modes, self.performance_data['estimation_errors'])
+                               if m == 'degradado']
+            print(f"   Iteraciones en modo degradado: {len(degraded_errors)} de {len(modes)}")
+            print(f"   Números descartados (solo estimados): {self.shed_records}")
+            if degraded_errors:
+                print(f"   Error de estimación máximo: {max(degraded_errors):.2%}")
+        if self.window_type:
+            closed = sum(len(r) for r in self.performance_data['window_results'])
+            print(f"   Ventanas cerradas: {closed}")
+        if self.partition_mode and self.partition_readers:
+            counts, rates, throughput, skew = self._partition_ingest_stats()
+            print(f"   Particiones: {len(counts)} ({self.partition_mode})")
+            for producer_id in sorted(counts):
+                print(f"      P{producer_id}: {counts[producer_id]} escritos, "
+                      f"{self.partition_consumed[producer_id]} consumidos, "
+                      f"{rates.get(producer_id, 0):.1f} números/s")
+            print(f"   Ingesta agregada: {throughput:.1f} números/s")
+            print(f"   Skew entre particiones: {skew:.2f} (máx/media)")
+        if self.capacity_enabled and self.performance_data['arrival_rates']:
+            arrival = self.performance_data['arrival_rates']
+            saturated = sum(1 for a, s in zip(arrival, self.performance_data['service_rates']) if a > s)
+            print(f"   Capacidad: {self._format_capacity(self.capacity.summary())}")
+            print(f"   Llegada máxima: {max(arrival):.2f} números/s, "
+                  f"iteraciones saturadas: {saturated} de {len(arrival)}")
+        if self.profiler.enabled and self.profiler.polls:
+            print(f"   Perfilado por etapa ({len(self.profiler.polls)} lecturas, ms):")
+            for stage, stats in self.profiler.summary().items():
+                p = stats['percentiles']
+                print(f"      {STAGE_LABELS[stage]:<16} p50={p[50]:.3f} p95={p[95]:.3f} "
+                      f"p99={p[99]:.3f} ({stats['share']:.1%} del total)")
+            if self.profiler.snapshots:
+                print(f"   Instantáneas guardadas: {len(self.profiler.snapshots)} "
+                      f"en {self.profiler.output_folder}/")
+        if self.sketches_enabled and self.sketches:
+            self.print_sketch_report()
+
+    def print_sketch_report(self):
+        """Estimaciones de los sketches y, con el benchmark, comparación con los exactos"""
+        print(f"\n🧮 SKETCHES vs EXACTO:" if self.sketch_benchmark else f"\n🧮 SKETCHES:")
+        
+        # Un resumen por formato y la combinación de todos ellos (merge)
+        summaries = dict(sorted(self.sketches.items()))
+        if len(summaries) > 1:
+            merged = StreamSummary(exact=self.sketch_benchmark)
+            for summary in summaries.values():
+                merged.merge(summary)
+            summaries['combinado'] = merged
+        
+        for name, summary in summaries.items():
+            report = summary.report()
+            exact = report.get('exact')
+            print(f"   {name} ({report['n']} registros):")
+            if not exact:
+                quantiles = ', '.join(f"p{q * 100:g}≈{value}" for q, value in report['quantiles'].items())
+                corruptions = ', '.join(f"{kind}≈{report['corruptions'][kind]}"
+                                        for kind in StreamSummary.CORRUPTION_KINDS)
+                print(f"      Distintos (HyperLogLog): ≈{report['distinct']:.0f} "
+                      f"(error teórico ±{report['distinct_error']:.1%})")
+                print(f"      Percentiles (KLL): {quantiles}")
+                print(f"      Corruptos (Count-Min): {corruptions} (cota ±{report['corruptions_error']:.1f})")
+                print(f"      Memoria: sketches {report['sketch_bytes'] / 1024:.1f} KB")
+                continue
+            print(f"      Distintos (HyperLogLog): {report['distinct']:.0f} vs {exact['distinct']} exactos "
+                  f"(error teórico ±{report['distinct_error']:.1%})")
+            for q, value in report['quantiles'].items():
+                print(f"      p{q * 100:g} (KLL): {value} vs {exact['quantiles'][q]} exacto")
+            corruptions = ', '.join(f"{kind}={report['corruptions'][kind]}/{exact['corruptions'][kind]}"
+                                    for kind in StreamSummary.CORRUPTION_KINDS)
+            print(f"      Corruptos (Count-Min/exacto): {corruptions} "
+                  f"(cota ±{report['corruptions_error']:.1f})")
+            print(f"      Memoria: sketches {report['sketch_bytes'] / 1024:.1f} KB vs "
+                  f"exacto {exact['bytes'] / 1024:.1f} KB")
 
     def find_files_to_process(self):
         """Encuentra archivos existentes para procesar"""
@@ -309,42 +967,52 @@ class BigDataConsumer:
         """Procesa todos los archivos disponibles"""
         start_time = time.time()
         
-        files_to_process = self.find_files_to_process()
+        with self.profiler.stage('discovery'):
+            files_to_process = self.find_files_to_process()
+        
+        if self.partition_mode:
+            return self.process_partitions(start_time)
         
         if not files_to_process:
             return None
         
+        # Detección barata de cambios: generación del manifiesto, inodo, mtime y tamaño
+        with self.profiler.stage('stat'):
+            self.manifest = read_manifest(self.data_folder)
+            current_signatures = {filepath: file_signature(filepath, self.manifest)
+                                  for filepath in files_to_process}
+        unchanged = current_signatures == self.last_file_signatures
+        self.last_file_signatures = current_signatures
+        
+        # Para velocity: sin cambios y sin backlog pendiente no hace falta leer los archivos
+        # (también con load shedding, antes de leerlos para medir el retraso)
+        if self.velocity and unchanged and self.processed_count >= self.known_total:
+            return None
+        
+        # Para velocity con load shedding: decidir el modo según el retraso
+        file_numbers = None
+        if self.velocity and self.load_shedding:
+            file_numbers = {filepath: self.get_file_numbers(filepath) for filepath in files_to_process}
+            self.known_total = max([self.known_total] + [len(n) for n in file_numbers.values()])
+            lag = self.known_total - self.processed_count
+            self._update_shedding_mode(lag)
+            if lag <= 0:
+                return None
+            if self.degraded:
+                return self.process_degraded(file_numbers, start_time)
+        
         # Para velocity: verificar si hay números nuevos que procesar
         if self.velocity:
             # En velocity, verificamos si hay más números que los ya procesados
-            for filepath in files_to_process:
-                numbers = self.get_file_numbers(filepath)
-                if len(numbers) > self.processed_count:
-                    # Hay números nuevos para procesar
-                    break
-            else:
+            # (cada archivo se lee una sola vez por iteración y se reutiliza después)
+            if file_numbers is None:
+                file_numbers = {filepath: self.get_file_numbers(filepath) for filepath in files_to_process}
+            if not any(len(numbers) > self.processed_count for numbers in file_numbers.values()):
                 # No hay números nuevos
                 return None
-        else:
-            # Para otros modos: verificar cambios en tamaño de archivos
-            current_sizes = {}
-            has_changes = False
-            
-            for filepath in files_to_process:
-                try:
-                    size = Path(filepath).stat().st_size
-                    current_sizes[filepath] = size
-                    if filepath not in self.last_file_sizes or self.last_file_sizes[filepath] != size:
-                        has_changes = True
-                except:
-                    current_sizes[filepath] = 0
-            
-            # Si no hay cambios, no procesar
-            if not has_changes and self.last_file_sizes:
-                return None
-            
-            # Actualizar tamaños
-            self.last_file_sizes = current_sizes.copy()
+        elif unchanged:
+            # Para otros modos: si ningún archivo ha cambiado, no procesar
+            return None
         
         if self.variety and self.velocity:
             # Variety + Velocity: procesar un número de cada formato
@@ -353,16 +1021,18 @@ class BigDataConsumer:
             has_new_numbers = False
             for filepath in files_to_process:
                 # Para velocity: obtener solo el siguiente número sin procesar
-                new_numbers, total_in_file = self.get_next_number_for_velocity(filepath)
+                new_numbers, total_in_file = self.get_next_number_for_velocity(filepath, file_numbers[filepath])
                 file_type = Path(filepath).suffix
                 
                 if new_numbers:
                     has_new_numbers = True
-                    file_sum = new_numbers[0]  # Solo el número nuevo
-                    results_by_type[file_type]['sum'] = file_sum
-                    results_by_type[file_type]['count'] = 1
-                    results_by_type[file_type]['files'] = [Path(filepath).name]
-                    results_by_type[file_type]['total_in_file'] = total_in_file
+                    with self.profiler.stage('aggregate'):
+                        self.consume_new_records(filepath, new_numbers, self.processed_count - 1, total_in_file)
+                        file_sum = new_numbers[0]  # Solo el número nuevo
+                        results_by_type[file_type]['sum'] = file_sum
+                        results_by_type[file_type]['count'] = 1
+                        results_by_type[file_type]['files'] = [Path(filepath).name]
+                        results_by_type[file_type]['total_in_file'] = total_in_file
             
             if not has_new_numbers:
                 return None
@@ -386,23 +1056,16 @@ class BigDataConsumer:
             # Detectar discrepancias si veracity está activo
             errors_detected = 0
             if self.veracity and len(results_by_type) > 1:
-                sums = [data['sum'] for data in results_by_type.values()]
-                if len(set(sums)) > 1:
-                    errors_detected = 1
+                with self.profiler.stage('veracity'):
+                    sums = [data['sum'] for data in results_by_type.values()]
+                    if len(set(sums)) > 1:
+                        errors_detected = 1
+                if errors_detected:
                     print(f"⚠️  DISCREPANCIA DETECTADA: Los números no coinciden entre formatos")
             
             # Recopilar datos para gráfica (variety + velocity)
-            if len(self.performance_data['iterations']) == 0:
-                iteration = 0
-            else:
-                iteration = self.performance_data['iterations'][-1] + 1
-            
-            self.performance_data['iterations'].append(iteration)
-            self.performance_data['processing_times'].append(processing_time)
-            self.performance_data['numbers_in_file'].append(total_in_all_files)
-            self.performance_data['numbers_processed'].append(1)  # Solo 1 por iteración en velocity
-            self.performance_data['total_numbers_processed'].append(self.processed_count)
-            self.performance_data['veracity_errors'].append(errors_detected)
+            self._record_performance(processing_time, total_in_all_files, 1,
+                                     self.processed_count, errors_detected)
             
             return processing_time
             
@@ -413,12 +1076,15 @@ class BigDataConsumer:
             for filepath in files_to_process:
                 numbers = self.get_file_numbers(filepath)
                 if numbers:
-                    file_sum = sum(numbers)
-                    file_type = Path(filepath).suffix
-                    
-                    results_by_type[file_type]['sum'] = file_sum  # Cambio: asignar en lugar de sumar
-                    results_by_type[file_type]['count'] = len(numbers)  # Total actual
-                    results_by_type[file_type]['files'] = [Path(filepath).name]
+                    with self.profiler.stage('aggregate'):
+                        self.consume_new_records_from_file(filepath, numbers)
+                        file_sum = sum(numbers)
+                        file_type = Path(filepath).suffix
+                        
+                        results_by_type[file_type]['sum'] = file_sum  # Cambio: asignar en lugar de sumar
+                        results_by_type[file_type]['count'] = len(numbers)  # Total actual
+                        results_by_type[file_type]['files'] = [Path(filepath).name]
+                        results_by_type[file_type]['numbers'] = numbers
             
             end_time = time.time()
             processing_time = (end_time - start_time) * 1000
@@ -438,32 +1104,34 @@ class BigDataConsumer:
             # Detectar discrepancias si veracity está activo
             errors_detected = 0
             if self.veracity and len(results_by_type) > 1:
-                sums = [data['sum'] for data in results_by_type.values()]
-                if len(set(sums)) > 1:
-                    errors_detected = 1
+                with self.profiler.stage('veracity'):
+                    # Un formato puede ir por detrás (escrituras retrasadas): comparar el prefijo común
+                    counts = [data['count'] for data in results_by_type.values()]
+                    common = min(counts)
+                    if len(set(counts)) > 1:
+                        sums = [sum(data['numbers'][:common]) for data in results_by_type.values()]
+                        print(f"⏳ Formatos con distinto número de registros: "
+                              f"se comparan los primeros {common}")
+                    else:
+                        sums = [data['sum'] for data in results_by_type.values()]
+                    if len(set(sums)) > 1:
+                        errors_detected = 1
+                if errors_detected:
                     print(f"⚠️  DISCREPANCIA DETECTADA: Las sumas no coinciden entre formatos")
             
             # Recopilar datos para gráfica (variety/veracity)
-            if len(self.performance_data['iterations']) == 0:
-                iteration = 0
-            else:
-                iteration = self.performance_data['iterations'][-1] + 1
-            
-            self.performance_data['iterations'].append(iteration)
-            self.performance_data['processing_times'].append(processing_time)
-            self.performance_data['numbers_in_file'].append(total_numbers_variety)
-            self.performance_data['numbers_processed'].append(total_numbers_variety)
-            self.performance_data['total_numbers_processed'].append(total_numbers_variety)
-            self.performance_data['veracity_errors'].append(errors_detected)
+            self._record_performance(processing_time, total_numbers_variety, total_numbers_variety,
+                                     total_numbers_variety, errors_detected)
             
             return processing_time
             
         elif self.velocity:
             # Velocity sin variety: procesar solo UN número nuevo por vez
             for filepath in files_to_process:
-                new_numbers, total_in_file = self.get_next_number_for_velocity(filepath)
+                new_numbers, total_in_file = self.get_next_number_for_velocity(filepath, file_numbers[filepath])
                 
                 if new_numbers:
+                    self.consume_new_records(filepath, new_numbers, self.processed_count - 1, total_in_file)
                     end_time = time.time()
                     processing_time = (end_time - start_time) * 1000
                     
@@ -474,17 +1142,8 @@ class BigDataConsumer:
                     print(f"📊 Total procesados hasta ahora: {self.processed_count}")
                     
                     # Recopilar datos para gráfica (solo en velocity)
-                    if len(self.performance_data['iterations']) == 0:
-                        iteration = 0
-                    else:
-                        iteration = self.performance_data['iterations'][-1] + 1
-                    
-                    self.performance_data['iterations'].append(iteration)
-                    self.performance_data['processing_times'].append(processing_time)
-                    self.performance_data['numbers_in_file'].append(total_in_file)
-                    self.performance_data['numbers_processed'].append(1)  # Siempre 1 en velocity
-                    self.performance_data['total_numbers_processed'].append(self.processed_count)
-                    self.performance_data['veracity_errors'].append(0)  # No hay errores en velocity puro
+                    self._record_performance(processing_time, total_in_file, 1,
+                                             self.processed_count, 0)
                     
                     return processing_time
             
@@ -499,8 +1158,10 @@ class BigDataConsumer:
             for filepath in files_to_process:
                 numbers = self.get_file_numbers(filepath)
                 if numbers:
-                    total_sum = sum(numbers)  # Total actual en el archivo
-                    total_numbers = len(numbers)  # Cantidad actual
+                    with self.profiler.stage('aggregate'):
+                        self.consume_new_records_from_file(filepath, numbers)
+                        total_sum = sum(numbers)  # Total actual en el archivo
+                        total_numbers = len(numbers)  # Cantidad actual
             
             end_time = time.time()
             processing_time = (end_time - start_time) * 1000
@@ -511,70 +1172,184 @@ class BigDataConsumer:
             print(f"📊 Números totales procesados: {total_numbers}")
             
             # Recopilar datos para gráfica (volume, etc)
-            if len(self.performance_data['iterations']) == 0:
-                iteration = 0
-            else:
-                iteration = self.performance_data['iterations'][-1] + 1
-            
-            self.performance_data['iterations'].append(iteration)
-            self.performance_data['processing_times'].append(processing_time)
-            self.performance_data['numbers_in_file'].append(total_numbers)
-            self.performance_data['numbers_processed'].append(total_numbers)
-            self.performance_data['total_numbers_processed'].append(total_numbers)
-            self.performance_data['veracity_errors'].append(0)  # No hay errores en volume puro
+            self._record_performance(processing_time, total_numbers, total_numbers,
+                                     total_numbers, 0)
             
             return processing_time
 
-    def run(self):
-        """Ejecuta el consumer continuamente"""
+    def print_configuration(self):
+        """Muestra la configuración del consumer al iniciar"""
         print("🔍 Consumer iniciado...")
         print(f"   Velocity: {self.velocity}")
         print(f"   Volume: {self.volume}")
         print(f"   Variety: {self.variety}")
         print(f"   Veracity: {self.veracity}")
+        if self.load_shedding:
+            print(f"   Load shedding: activar con retraso > {self.shed_threshold}, "
+                  f"desactivar con retraso <= {self.recover_threshold}")
+        if self.partition_mode:
+            print(f"   Particiones: {self.partition_mode} (clave {self.merge_key})")
+        if self.sketches_enabled:
+            print(f"   Sketches: HyperLogLog, Count-Min y KLL por formato"
+                  f"{' (con benchmark exacto)' if self.sketch_benchmark else ''}")
+        if self.capacity_enabled:
+            print(f"   Capacidad: utilización objetivo {self.capacity.target_utilization:.0%}")
+        if self.profiler.enabled:
+            snapshot = (f", {self.profiler.snapshot} cada {self.profiler.snapshot_every} lecturas"
+                        if self.profiler.snapshot else "")
+            print(f"   Perfilado: tiempos por etapa{snapshot}")
+        if self.window_type:
+            window = WindowAggregator(self.window_type, self.window_by,
+                                      self.window_size, self.window_slide)
+            print(f"   Ventanas: {window.describe()}")
+
+    def shutdown(self, iterations):
+        """Detiene el consumer: genera la gráfica y las estadísticas finales"""
+        self.profiler.abort_poll()
+        self.reporter.close()
+        print(f"\n🛑 Consumer detenido después de {iterations} iteraciones")
+        
+        # Generar gráfica de rendimiento
+        print("\n📊 Generando gráfica de rendimiento...")
+        try:
+            self.generate_performance_chart()
+        except Exception as e:
+            print(f"⚠️  Error generando gráfica: {e}")
+            print("Asegúrate de tener matplotlib instalado: pip install matplotlib")
+        finally:
+            self.profiler.close()
+
+    def run(self):
+        """Ejecuta el consumer continuamente"""
+        self.print_configuration()
         print("-" * 50)
         
         iteration = 0
         
         try:
             while True:
-                print(f"\n📋 Iteración {iteration}:")
-                
-                processing_time = self.process_files()
-                
-                if processing_time is None:
-                    print("   ⏳ No hay archivos nuevos para procesar...")
+                # La salida de la iteración se acumula y se escribe al terminar la lectura
+                with self.reporter.capture():
+                    print(f"\n📋 Iteración {iteration}:")
+                    
+                    self.profiler.begin_poll()
+                    processing_time = self.process_files()
+                    self.profiler.end_poll(processing_time is not None)
+                    
+                    if processing_time is None:
+                        print("   ⏳ No hay archivos nuevos para procesar...")
+                self.reporter.flush()
+                self.reporter.maybe_summary()
                 
-                time.sleep(1)  # Intervalo de lectura
+                time.sleep(self.poll_interval)  # Intervalo de lectura
                 iteration += 1
                 
         except KeyboardInterrupt:
-            print(f"\n🛑 Consumer detenido después de {iteration} iteraciones")
-            
-            # Generar gráfica de rendimiento
-            print("\n📊 Generando gráfica de rendimiento...")
-            try:
-                self.generate_performance_chart()
-            except Exception as e:
-                print(f"⚠️  Error generando gráfica: {e}")
-                print("Asegúrate de tener matplotlib instalado: pip install matplotlib")
+            self.shutdown(iteration)
 
-def main():
-    parser = argparse.ArgumentParser(description="Consumer para Big Data")
+def build_parser(description="Consumer para Big Data"):
+    """Opciones comunes de línea de comandos del consumer"""
+    parser = argparse.ArgumentParser(description=description)
     parser.add_argument("--velocity", type=str, default="false")
     parser.add_argument("--volume", type=str, default="false")
     parser.add_argument("--variety", type=str, default="false")
     parser.add_argument("--veracity", type=str, default="false")
+    parser.add_argument("--window", type=str, default="none",
+                        choices=["none", "tumbling", "sliding"],
+                        help="Tipo de ventana de agregación")
+    parser.add_argument("--window-by", type=str, default="count", choices=["count", "time"],
+                        help="Ventanas por número de registros o por timestamp del producer")
+    parser.add_argument("--window-size", type=float, default=10,
+                        help="Tamaño de la ventana (registros o segundos)")
+    parser.add_argument("--window-slide", type=float, default=None,
+                        help="Desplazamiento de la ventana sliding (por defecto, el tamaño)")
+    parser.add_argument("--load-shedding", type=str, default="false",
+                        help="Modo degradado con muestreo cuando el retraso supera el umbral (velocity)")
+    parser.add_argument("--shed-threshold", type=int, default=50,
+                        help="Retraso (números) que activa el modo degradado")
+    parser.add_argument("--recover-threshold", type=int, default=10,
+                        help="Retraso (números) por debajo del cual se vuelve al modo exacto")
+    parser.add_argument("--sample-size", type=int, default=100,
+                        help="Tamaño de la muestra por formato en modo degradado")
+    parser.add_argument("--sketches", type=str, default="false",
+                        help="Mantener sketches (HyperLogLog, Count-Min, KLL) con memoria acotada")
+    parser.add_argument("--sketch-benchmark", type=str, default="false",
+                        help="Guardar también los resultados exactos (memoria sin acotar) para comparar")
+    parser.add_argument("--partitions", type=str, default="none",
+                        choices=["none", "merge", "independent"],
+                        help="Leer las particiones de varios producers con merge ordenado o por separado")
+    parser.add_argument("--merge-key", type=str, default="timestamp", choices=["timestamp", "seq"],
+                        help="Clave del merge ordenado entre particiones")
+    parser.add_argument("--expected-partitions", type=int, default=None,
+                        help="Particiones que el merge espera antes de emitir (por defecto, las encontradas)")
+    parser.add_argument("--capacity", type=str, default="false",
+                        help="Estimar tasas de llegada y servicio, predecir la saturación y recomendar capacidad")
+    parser.add_argument("--profile", type=str, default="false",
+                        help="Medir el tiempo de cada etapa (descubrimiento, stat, lectura, parseo...)")
+    parser.add_argument("--profile-snapshot", type=str, default="none",
+                        choices=["none", "cprofile", "tracemalloc"],
+                        help="Guardar instantáneas periódicas de cProfile o tracemalloc en profiles/")
+    parser.add_argument("--profile-every", type=int, default=10,
+                        help="Lecturas entre instantáneas de perfilado")
+    parser.add_argument("--verbosity", type=str, default="verbose",
+                        choices=["quiet", "normal", "verbose"],
+                        help="verbose: cada línea al momento; normal: salida acumulada y limitada; "
+                             "quiet: solo resúmenes y estadísticas finales")
+    parser.add_argument("--report-interval", type=float, default=5.0,
+                        help="Segundos entre volcados de la salida acumulada (verbosidad normal)")
+    parser.add_argument("--summary-interval", type=float, default=None,
+                        help="Segundos entre resúmenes JSON (por defecto 10, o ninguno con verbose)")
+    return parser
+
+def consumer_arguments(args):
+    """Convierte las opciones en los argumentos con nombre de BigDataConsumer"""
+    return {
+        # Convertir a booleans
+        'velocity': args.velocity.lower() == "true",
+        'volume': args.volume.lower() == "true",
+        'variety': args.variety.lower() == "true",
+        'veracity': args.veracity.lower() == "true",
+        
+        'window_type': None if args.window == "none" else args.window,
+        'window_by': args.window_by,
+        'window_size': args.window_size,
+        'window_slide': args.window_slide,
+        'load_shedding': args.load_shedding.lower() == "true",
+        'shed_threshold': args.shed_threshold,
+        'recover_threshold': args.recover_threshold,
+        'sample_size': args.sample_size,
+        'sketches': args.sketches.lower() == "true",
+        'sketch_benchmark': args.sketch_benchmark.lower() == "true",
+        'partition_mode': None if args.partitions == "none" else args.partitions,
+        'merge_key': args.merge_key,
+        'expected_partitions': args.expected_partitions,
+        'capacity': args.capacity.lower() == "true",
+        'profile': args.profile.lower() == "true",
+        'profile_snapshot': None if args.profile_snapshot == "none" else args.profile_snapshot,
+        'profile_every': args.profile_every,
+        'verbosity': args.verbosity,
+        'report_interval': args.report_interval,
+        'summary_interval': args.summary_interval
+    }
+
+def main():
+    args = build_parser().parse_args()
     
-    args = parser.parse_args()
+    # El modo degradado depende del retraso, que solo existe en velocity
+    if args.load_shedding.lower() == "true" and args.velocity.lower() != "true":
+        print("❌ Error: --load-shedding necesita --velocity true")
+        sys.exit(1)
     
-    # Convertir a booleans
-    velocity = args.velocity.lower() == "true"
-    volume = args.volume.lower() == "true"
-    variety = args.variety.lower() == "true"
-    veracity = args.veracity.lower() == "true"
+    # Las particiones se procesan aparte: sin modo degradado ni archivos por formato
+    if args.partitions != "none" and (args.load_shedding.lower() == "true"
+                                      or args.variety.lower() == "true"):
+        print("❌ Error: --partitions no admite --load-shedding ni --variety")
+        sys.exit(1)
+    if args.expected_partitions is not None and args.expected_partitions < 1:
+        print("❌ Error: --expected-partitions debe ser al menos 1")
+        sys.exit(1)
     
-    consumer = BigDataConsumer(velocity, volume, variety, veracity)
+    consumer = BigDataConsumer(**consumer_arguments(args))
     consumer.run()
 
 if __name__ == "__main__":
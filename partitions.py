@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Particiones para el ejercicio con varios producers concurrentes
+Cada producer escribe su propio archivo de partición y el consumer las lee
+de forma incremental, por separado o con un merge ordenado de k vías
+"""
+
+import heapq
+from collections import deque
+from pathlib import Path
+
+PARTITION_HEADER = ['producer_id', 'seq', 'timestamp', 'number']
+PARTITION_PATTERN = "partition-*.csv"
+
+
+def partition_path(data_folder, producer_id):
+    """Ruta del archivo de partición de un producer"""
+    return Path(data_folder) / f"partition-{producer_id}.csv"
+
+
+class PartitionReader:
+    """Lee de forma incremental los registros nuevos de un archivo de partición.
+
+    Guarda el offset en bytes ya leído y solo devuelve líneas completas, así que
+    nunca procesa un registro que el producer está escribiendo en ese momento.
+    """
+
+    def __init__(self, filepath):
+        self.filepath = Path(filepath)
+        self.offset = 0
+        self.records_read = 0
+        self.last_timestamp = None
+        self.last_seq = None
+
+    def read_new_records(self, committed_length=None):
+        """Devuelve la lista de registros nuevos (producer_id, seq, timestamp, number).
+        
+        Si se indica committed_length (manifiesto del producer) no se lee más allá.
+        """
+        if committed_length is not None and committed_length <= self.offset:
+            return []
+        try:
+            with open(self.filepath, 'rb') as f:
+                f.seek(self.offset)
+                if committed_length is None:
+                    chunk = f.read()
+                else:
+                    chunk = f.read(committed_length - self.offset)
+        except FileNotFoundError:
+            return []
+        
+        # Descartar la última línea si todavía no está completa
+        end = chunk.rfind(b'\n')
+        if end < 0:
+            return []
+        self.offset += end + 1
+        
+        records = []
+        for line in chunk[:end].decode().splitlines():
+            fields = line.split(',')
+            if len(fields) != len(PARTITION_HEADER) or fields[0] == PARTITION_HEADER[0]:
+                continue  # Cabecera o línea no válida
+            try:
+                record = (int(fields[0]), int(fields[1]), float(fields[2]), int(fields[3]))
+            except ValueError:
+                continue
+            records.append(record)
+        
+        if records:
+            self.records_read += len(records)
+            self.last_seq = records[-1][1]
+            self.last_timestamp = records[-1][2]
+        return records
+
+
+class OrderedMerger:
+    """Merge ordenado de k vías entre particiones, por timestamp o por secuencia.
+
+    Un registro solo se emite cuando todas las particiones han avanzado al menos
+    hasta su clave (marca de agua), de modo que el orden global nunca se rompe
+    aunque una partición vaya por detrás de las demás. Con expected no se emite
+    nada hasta conocer ese número de particiones: una partición que aparece tarde
+    podría traer claves anteriores a las ya emitidas.
+    """
+
+    def __init__(self, key='timestamp', expected=None):
+        if key not in ('timestamp', 'seq'):
+            raise ValueError(f"Clave de merge desconocida: {key}")
+        self.key = key
+        self.expected = expected
+        self.buffers = {}
+        self.watermarks = {}
+
+    def _sort_key(self, record):
+        producer_id, seq, timestamp, _ = record
+        if self.key == 'timestamp':
+            return (timestamp, producer_id, seq)
+        return (seq, producer_id, timestamp)
+
+    def add(self, producer_id, records):
+        """Añade registros nuevos (ya ordenados) de una partición"""
+        buffer = self.buffers.setdefault(producer_id, deque())
+        buffer.extend(records)
+        if records:
+            self.watermarks[producer_id] = self._sort_key(records[-1])
+        else:
+            self.watermarks.setdefault(producer_id, None)
+
+    def waiting_partitions(self):
+        """Particiones esperadas que todavía no han aparecido"""
+        if self.expected is None:
+            return 0
+        return max(self.expected - len(self.watermarks), 0)
+
+    def pending(self):
+        """Registros en espera de que avance la marca de agua"""
+        return sum(len(buffer) for buffer in self.buffers.values())
+
+    def pop_ready(self, limit=None):
+        """Devuelve, en orden global, los registros que ya se pueden emitir"""
+        if not self.watermarks or None in self.watermarks.values() or self.waiting_partitions():
+            return []
+        watermark = min(self.watermarks.values())
+        
+        ready = []
+        for buffer in self.buffers.values():
+            prefix = []
+            while buffer and self._sort_key(buffer[0]) <= watermark:
+                prefix.append(buffer.popleft())
+            ready.append(prefix)
+        
+        merged = list(heapq.merge(*ready, key=self._sort_key))
+        if limit is not None and len(merged) > limit:
+            # Devolver a su buffer los registros que no caben en este lote
+            for record in reversed(merged[limit:]):
+                self.buffers[record[0]].appendleft(record)
+            merged = merged[:limit]
+        return merged
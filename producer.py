@@ -5,15 +5,22 @@ Genera datos según los parámetros especificados
 """
 
 import argparse
+import sys
 import time
 import json
 import csv
 import random
 from pathlib import Path
 from datetime import datetime
+from partitions import PARTITION_HEADER, partition_path
+from publication import Publisher, atomic_write_text
+from workload import WorkloadProfile
+from reporting import Reporter
 
 class BigDataProducer:
-    def __init__(self, velocity=False, volume=False, variety=False, veracity=False):
+    def __init__(self, velocity=False, volume=False, variety=False, veracity=False,
+                 producer_id=None, workload=None, verbosity='verbose', report_interval=5.0,
+                 summary_interval=None):
         self.velocity = velocity
         self.volume = volume
         self.variety = variety
@@ -29,6 +36,28 @@ class BigDataProducer:
         
         # Para veracity: introducir errores ocasionalmente
         self.error_probability = 0.1
+        
+        # Varios producers: cada uno escribe su propia partición con su secuencia
+        self.producer_id = producer_id
+        
+        # Publicación: manifiesto con generación y longitud confirmada de cada archivo
+        self.publisher = Publisher(self.data_folder, producer_id)
+        
+        # Perfil de carga declarativo (ritmo, tamaño de lote, formatos y errores)
+        self.workload = workload
+        # Números retrasados de los formatos que el perfil omite en un lote (variety)
+        self.delayed_numbers = {'txt': [], 'csv': [], 'json': []}
+        if workload is not None:
+            workload.reseed(producer_id or 0)
+            self.random = workload.random
+            self.error_probability = workload.error_probability(self.error_probability)
+        else:
+            self.random = random.Random()
+        self.start_time = time.time()
+        
+        # Salida por consola: verbosidad, volcados limitados y resúmenes JSON periódicos
+        role = f"producer-{producer_id}" if producer_id is not None else "producer"
+        self.reporter = Reporter(role, verbosity, report_interval, summary_interval)
 
     def generate_number(self):
         """Genera el próximo número en secuencia"""
@@ -38,9 +67,12 @@ class BigDataProducer:
 
     def introduce_error(self, number):
         """Para veracity: introduce errores ocasionalmente"""
-        if self.veracity and random.random() < self.error_probability:
+        if self.veracity and self.random.random() < self.error_probability:
             # Introducir diferentes tipos de errores
-            error_type = random.choice(['multiply', 'add', 'negative'])
+            if self.workload is not None:
+                error_type = self.workload.error_type()
+            else:
+                error_type = self.random.choice(['multiply', 'add', 'negative'])
             if error_type == 'multiply':
                 return number * 10
             elif error_type == 'add':
@@ -55,6 +87,7 @@ class BigDataProducer:
         with open(filename, 'a') as f:  # 'a' para append
             for num in numbers:
                 f.write(f"{num}\n")
+        return filename
 
     def write_csv_file(self, numbers):
         """Escribe números en archivo CSV"""
@@ -67,6 +100,7 @@ class BigDataProducer:
                 writer.writerow(['number'])  # Header solo si es nuevo
             for num in numbers:
                 writer.writerow([num])
+        return filename
 
     def write_json_file(self, numbers):
         """Escribe números en archivo JSON"""
@@ -89,16 +123,39 @@ class BigDataProducer:
         data = {
             'timestamp': datetime.now().isoformat(),
             'iteration': self.iteration,
+            'generation': self.publisher.generation + 1,
             'numbers': all_numbers
         }
-        with open(filename, 'w') as f:
-            json.dump(data, f, indent=2)
+        # Reescritura atómica: el consumer nunca ve un JSON a medio escribir
+        atomic_write_text(filename, json.dumps(data, indent=2))
+        return filename
+
+    def write_partition_file(self, records):
+        """Escribe registros (seq, número) en el archivo de partición del producer"""
+        filename = partition_path(self.data_folder, self.producer_id)
+        file_exists = filename.exists()
+        timestamp = time.time()
+        with open(filename, 'a', newline='') as f:
+            writer = csv.writer(f)
+            if not file_exists:
+                writer.writerow(PARTITION_HEADER)
+            for seq, num in records:
+                writer.writerow([self.producer_id, seq, f"{timestamp:.6f}", num])
+        return filename
+
+    def elapsed(self):
+        """Segundos desde que arrancó el producer (reloj de los perfiles de carga)"""
+        return time.time() - self.start_time
 
     def produce_data(self):
         """Produce datos según las configuraciones activas"""
         
         # Determinar cuántos números generar
-        if self.volume:
+        batch_size = self.workload.batch_size(self.elapsed()) if self.workload else None
+        if batch_size is not None:
+            # Perfil de carga: tamaño de lote según su curva
+            self.numbers_count = batch_size
+        elif self.volume:
             # Volume: incrementar cantidad de forma exponencial cada 2 iteraciones
             if self.iteration > 0 and self.iteration % 2 == 0:
                 # Crecimiento exponencial: 1, 10, 100, 500, 1000, 2500, 5000, 10000...
@@ -112,55 +169,87 @@ class BigDataProducer:
                 else:
                     self.numbers_count = growth_factor * 500  # 3500, 4000, 4500...
         
-        # Generar números
+        # Generar números (el timestamp del lote se publica en el manifiesto)
+        batch_time = time.time()
         numbers = []
         for _ in range(self.numbers_count):
             base_number = self.generate_number()
             numbers.append(base_number)
         
         # Escribir según variety
-        if self.variety:
-            # Escribir en múltiples formatos
-            # TXT - números normales
-            txt_numbers = [self.introduce_error(num) for num in numbers.copy()]
-            self.write_txt_file(txt_numbers)
+        if self.producer_id is not None:
+            # Varios producers: una única partición con metadatos por registro
+            records = [(num, self.introduce_error(num)) for num in numbers]
+            written_files = [self.write_partition_file(records)]
             
-            # CSV - números normales
-            csv_numbers = [self.introduce_error(num) for num in numbers.copy()]
-            self.write_csv_file(csv_numbers)
+        elif self.variety:
+            # Escribir en múltiples formatos. Si el perfil de carga omite un formato en este
+            # lote, sus números se retrasan y se escriben, en orden, cuando vuelve a estar
+            # activo: cada formato recibe siempre la secuencia completa
+            formats = self.workload.active_formats() if self.workload else ['txt', 'csv', 'json']
+            written_files = []
+            writers = {'txt': self.write_txt_file, 'csv': self.write_csv_file,
+                       'json': self.write_json_file}
             
-            # JSON - números normales
-            json_numbers = [self.introduce_error(num) for num in numbers.copy()]
-            self.write_json_file(json_numbers)
+            for fmt, write in writers.items():
+                self.delayed_numbers[fmt].extend(numbers)
+                if fmt in formats:
+                    fmt_numbers = [self.introduce_error(num) for num in self.delayed_numbers[fmt]]
+                    written_files.append(write(fmt_numbers))
+                    self.delayed_numbers[fmt] = []
+            
+            delayed = {fmt: len(pending) for fmt, pending in self.delayed_numbers.items() if pending}
+            if delayed:
+                pending = ', '.join(f"{fmt}={count}" for fmt, count in delayed.items())
+                print(f"⏳ Números retrasados por formato: {pending}")
             
         else:
             # Solo escribir en TXT por defecto
             final_numbers = [self.introduce_error(num) for num in numbers]
-            self.write_txt_file(final_numbers)
+            written_files = [self.write_txt_file(final_numbers)]
+        
+        # Confirmar la nueva generación solo cuando todo está escrito
+        self.publisher.commit(written_files, self.current_number - 1, batch_time)
         
-        print(f"📝 Iteración {self.iteration}: Generados {len(numbers)} números "
-              f"(Sleep: {self.sleep_time:.1f}s)")
+        prefix = f"[P{self.producer_id}] " if self.producer_id is not None else ""
+        print(f"📝 {prefix}Iteración {self.iteration}: Generados {len(numbers)} números "
+              f"(Sleep: {self.sleep_time:.1f}s, Generación: {self.publisher.generation})")
 
     def run(self):
         """Ejecuta el producer continuamente"""
         print("🏭 Producer iniciado...")
+        if self.producer_id is not None:
+            print(f"   Partición: {partition_path(self.data_folder, self.producer_id)}")
         print(f"   Velocity: {self.velocity}")
         print(f"   Volume: {self.volume}")
         print(f"   Variety: {self.variety}")
         print(f"   Veracity: {self.veracity}")
+        if self.workload is not None:
+            print(f"   Perfil de carga: {self.workload.describe()}")
         
         try:
             while True:
-                self.produce_data()
+                # La salida del lote se acumula y se escribe después de publicarlo
+                started = time.time()
+                with self.reporter.capture():
+                    self.produce_data()
+                self.reporter.observe(self.numbers_count, (time.time() - started) * 1000)
+                self.reporter.flush()
+                self.reporter.maybe_summary()
                 
-                # Velocity: reducir sleep time cada 2 iteraciones
-                if self.velocity and self.iteration > 0 and self.iteration % 2 == 0:
+                sleep_time = self.workload.sleep_time(self.elapsed()) if self.workload else None
+                if sleep_time is not None:
+                    # Perfil de carga: ritmo según su curva (y ráfagas)
+                    self.sleep_time = sleep_time
+                elif self.velocity and self.iteration > 0 and self.iteration % 2 == 0:
+                    # Velocity: reducir sleep time cada 2 iteraciones
                     self.sleep_time = max(0.1, self.sleep_time - 0.2)
                 
                 time.sleep(self.sleep_time)
                 self.iteration += 1
                 
         except KeyboardInterrupt:
+            self.reporter.close()
             print("\n🛑 Producer detenido")
 
 def main():
@@ -169,6 +258,18 @@ def main():
     parser.add_argument("--volume", type=str, default="false")
     parser.add_argument("--variety", type=str, default="false")
     parser.add_argument("--veracity", type=str, default="false")
+    parser.add_argument("--producer-id", type=int, default=None,
+                        help="Identificador del producer (escribe su propia partición)")
+    parser.add_argument("--workload", type=str, default=None,
+                        help="Perfil de carga (JSON o TOML) con ritmo, lotes, formatos y errores")
+    parser.add_argument("--verbosity", type=str, default="verbose",
+                        choices=["quiet", "normal", "verbose"],
+                        help="verbose: cada lote al momento; normal: salida acumulada y limitada; "
+                             "quiet: solo resúmenes")
+    parser.add_argument("--report-interval", type=float, default=5.0,
+                        help="Segundos entre volcados de la salida acumulada (verbosidad normal)")
+    parser.add_argument("--summary-interval", type=float, default=None,
+                        help="Segundos entre resúmenes JSON (por defecto 10, o ninguno con verbose)")
     
     args = parser.parse_args()
     
@@ -178,7 +279,16 @@ def main():
     variety = args.variety.lower() == "true"
     veracity = args.veracity.lower() == "true"
     
-    producer = BigDataProducer(velocity, volume, variety, veracity)
+    workload = None
+    if args.workload:
+        try:
+            workload = WorkloadProfile.load(args.workload)
+        except (OSError, ValueError) as e:
+            print(f"❌ Error cargando el perfil de carga: {e}")
+            sys.exit(1)
+    
+    producer = BigDataProducer(velocity, volume, variety, veracity, args.producer_id, workload,
+                               args.verbosity, args.report_interval, args.summary_interval)
     producer.run()
 
 if __name__ == "__main__":
@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""
+Perfilado por etapas del consumer
+- Temporizadores por etapa en cada lectura: descubrimiento, stat, lectura, parseo,
+  agregación, veracidad, informes e impresión (el resto del tiempo queda como "otros")
+- Los tiempos son exclusivos: una etapa anidada descuenta su tiempo a la exterior
+- Instantáneas periódicas de cProfile o tracemalloc guardadas en disco
+"""
+
+import cProfile
+import math
+import sys
+import time
+import tracemalloc
+from contextlib import nullcontext
+from pathlib import Path
+
+STAGES = ('discovery', 'stat', 'read', 'parse', 'aggregate', 'veracity', 'report', 'print', 'other')
+STAGE_LABELS = {
+    'discovery': 'Descubrimiento',
+    'stat': 'Stat/manifiesto',
+    'read': 'Lectura',
+    'parse': 'Parseo',
+    'aggregate': 'Agregación',
+    'veracity': 'Veracidad',
+    'report': 'Informes',
+    'print': 'Impresión',
+    'other': 'Otros'
+}
+SNAPSHOT_MODES = ('cprofile', 'tracemalloc')
+
+
+def percentile(values, q):
+    """Percentil q (0-100) por el método del rango más cercano"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(q / 100 * len(ordered)) - 1)]
+
+
+class _Stage:
+    """Contexto que mide una etapa en el perfilador"""
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.profiler._enter(self.name)
+        return self
+
+    def __exit__(self, *exc):
+        self.profiler._exit()
+        return False
+
+
+class TimedStream:
+    """Envuelve sys.stdout para cargar el tiempo de escritura a la etapa 'print'"""
+
+    def __init__(self, stream, profiler):
+        self.stream = stream
+        self.profiler = profiler
+
+    def write(self, text):
+        with self.profiler.stage('print'):
+            return self.stream.write(text)
+
+    def flush(self):
+        with self.profiler.stage('print'):
+            return self.stream.flush()
+
+    def __getattr__(self, name):
+        return getattr(self.stream, name)
+
+
+class StageProfiler:
+    """Temporizadores por etapa para cada lectura (poll) del consumer"""
+
+    def __init__(self, enabled=False, snapshot=None, snapshot_every=10, output_folder="profiles"):
+        if snapshot is not None and snapshot not in SNAPSHOT_MODES:
+            raise ValueError(f"Tipo de instantánea desconocido: {snapshot}")
+        self.enabled = enabled
+        self.snapshot = snapshot if enabled else None
+        self.snapshot_every = max(1, snapshot_every)
+        self.output_folder = Path(output_folder)
+        self.polls = []          # Tiempos por etapa (ms) de las lecturas que procesaron datos
+        self.snapshots = []      # Rutas de las instantáneas guardadas
+        self.poll_index = 0
+        self._current = None
+        self._stack = []         # [nombre, inicio del tramo actual]
+        self._poll_start = None
+        self._cprofile = None
+        
+        if self.enabled:
+            sys.stdout = TimedStream(sys.stdout, self)
+            if self.snapshot == 'tracemalloc':
+                tracemalloc.start()
+
+    def stage(self, name):
+        """Contexto que carga el tiempo transcurrido a la etapa indicada"""
+        if self._current is None:
+            return nullcontext()
+        return _Stage(self, name)
+
+    def _enter(self, name):
+        now = time.perf_counter()
+        if self._stack:
+            # Pausar la etapa exterior mientras dura la anidada
+            parent = self._stack[-1]
+            self._current[parent[0]] += (now - parent[1]) * 1000
+        self._stack.append([name, now])
+
+    def _exit(self):
+        now = time.perf_counter()
+        name, started = self._stack.pop()
+        self._current[name] += (now - started) * 1000
+        if self._stack:
+            self._stack[-1][1] = now
+
+    def begin_poll(self):
+        """Empieza a medir una lectura del consumer"""
+        if not self.enabled:
+            return
+        self._current = {stage: 0.0 for stage in STAGES}
+        self._stack = []
+        if self.snapshot == 'cprofile' and self.poll_index % self.snapshot_every == 0:
+            self._cprofile = cProfile.Profile()
+            self._cprofile.enable()
+        self._poll_start = time.perf_counter()
+
+    def end_poll(self, processed):
+        """Termina la lectura; solo se guardan las que procesaron datos"""
+        if not self.enabled or self._current is None:
+            return
+        total = (time.perf_counter() - self._poll_start) * 1000
+        stages = self._current
+        self._current = None
+        stages['other'] = max(0.0, total - sum(stages.values()))
+        if processed:
+            self.polls.append(stages)
+        
+        if self._cprofile is not None:
+            self._cprofile.disable()
+            self._save_snapshot('cprofile', self._cprofile.dump_stats, 'prof')
+            self._cprofile = None
+        elif self.snapshot == 'tracemalloc' and self.poll_index % self.snapshot_every == 0:
+            self._save_snapshot('tracemalloc', tracemalloc.take_snapshot().dump, 'snapshot')
+        self.poll_index += 1
+
+    def abort_poll(self):
+        """Descarta la lectura en curso (p.ej. interrumpida con Ctrl+C)"""
+        if self._cprofile is not None:
+            self._cprofile.disable()
+            self._cprofile = None
+        self._current = None
+        self._stack = []
+
+    def _save_snapshot(self, kind, dump, extension):
+        self.output_folder.mkdir(exist_ok=True)
+        path = self.output_folder / f"{kind}-{self.poll_index:05d}.{extension}"
+        dump(str(path))
+        self.snapshots.append(path)
+        print(f"🔬 Instantánea {kind} guardada en {path}")
+
+    def stage_series(self, stage):
+        """Tiempos (ms) de una etapa en cada lectura guardada"""
+        return [poll[stage] for poll in self.polls]
+
+    def summary(self, quantiles=(50, 95, 99)):
+        """Percentiles y porcentaje del tiempo total de cada etapa"""
+        grand_total = sum(sum(poll.values()) for poll in self.polls) or 1.0
+        result = {}
+        for stage in STAGES:
+            series = self.stage_series(stage)
+            result[stage] = {
+                'percentiles': {q: percentile(series, q) for q in quantiles},
+                'share': sum(series) / grand_total
+            }
+        return result
+
+    def close(self):
+        """Restaura sys.stdout y detiene tracemalloc"""
+        if isinstance(sys.stdout, TimedStream):
+            sys.stdout = sys.stdout.stream
+        if self.snapshot == 'tracemalloc' and tracemalloc.is_tracing():
+            tracemalloc.stop()
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Publicación atómica de los datos del producer
+- Escritura a un archivo temporal + os.replace para los archivos que se reescriben
+- Manifiesto con número de generación y longitud confirmada de cada archivo
+- Firma de archivos para que el consumer detecte cambios sin leerlos
+"""
+
+import json
+import os
+import tempfile
+import time
+from collections import deque
+from pathlib import Path
+
+MANIFEST_NAME = "_manifest.json"
+MAX_BATCHES = 256  # Lotes recientes cuyo timestamp se publica en el manifiesto
+
+
+def manifest_path(data_folder, producer_id=None):
+    """Ruta del manifiesto (uno por producer cuando hay particiones)"""
+    if producer_id is None:
+        return Path(data_folder) / MANIFEST_NAME
+    return Path(data_folder) / f"_manifest-{producer_id}.json"
+
+
+def atomic_write_text(filepath, text):
+    """Escribe el archivo completo de forma atómica (temporal + os.replace).
+    
+    Sin fsync: os.replace basta para que los lectores vean siempre un archivo completo;
+    la durabilidad ante caídas del sistema no hace falta en data/ y añadiría un volcado
+    a disco en cada lote, falseando los tiempos del ejercicio.
+    """
+    filepath = Path(filepath)
+    fd, tmp_path = tempfile.mkstemp(dir=filepath.parent, prefix=f".{filepath.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, 'w') as f:
+            f.write(text)
+        os.chmod(tmp_path, 0o644)  # mkstemp crea el archivo con permisos 0600
+        os.replace(tmp_path, filepath)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+class Publisher:
+    """Confirma lo escrito por el producer en un manifiesto con generación creciente"""
+
+    def __init__(self, data_folder, producer_id=None):
+        self.path = manifest_path(data_folder, producer_id)
+        self.generation = 0
+        self.files = {}  # Longitud confirmada de cada archivo (se conserva si no se escribe)
+        self.batches = deque(maxlen=MAX_BATCHES)  # [fin del lote en la secuencia, timestamp]
+
+    def commit(self, filepaths, records=None, batch_time=None):
+        """Publica una nueva generación con la longitud confirmada de cada archivo.
+        
+        records es el número de registros confirmados por archivo, que permite
+        recortar los archivos que se reescriben enteros (JSON) a la misma generación.
+        batch_time es el momento en que se generó el lote, para las ventanas por tiempo.
+        """
+        self.generation += 1
+        if records is not None and batch_time is not None:
+            self.batches.append([records, batch_time])
+        for filepath in filepaths:
+            try:
+                self.files[Path(filepath).name] = Path(filepath).stat().st_size
+            except OSError:
+                continue
+        manifest = {
+            'generation': self.generation,
+            'timestamp': time.time(),
+            'records': records,
+            'files': self.files,
+            'batches': list(self.batches)
+        }
+        atomic_write_text(self.path, json.dumps(manifest))
+        return self.generation
+
+
+def read_manifest(data_folder, producer_id=None):
+    """Lee el manifiesto publicado o None si no existe (producer sin manifiesto)"""
+    try:
+        with open(manifest_path(data_folder, producer_id), 'r') as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+
+def file_signature(filepath, manifest=None):
+    """Firma barata para detectar cambios sin leer el archivo.
+
+    Con manifiesto basta la generación y la longitud confirmada: los bytes añadidos
+    pero aún no confirmados no provocan una lectura. Sin manifiesto se usa
+    (inodo, st_mtime_ns, tamaño).
+    """
+    if manifest:
+        return (manifest['generation'], manifest.get('files', {}).get(Path(filepath).name))
+    try:
+        stat = Path(filepath).stat()
+    except OSError:
+        return None
+    return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Salida por consola del producer y del consumer para cargas altas
+- Niveles de verbosidad: verbose (cada línea al momento, comportamiento clásico),
+  normal (salida acumulada y volcada como mucho cada intervalo) y quiet (solo
+  resúmenes y estadísticas finales)
+- La salida de cada iteración se acumula en memoria mientras se procesa y se
+  escribe después, fuera de la lectura (y del intervalo que mide el perfilador)
+- Línea de resumen estructurada (JSON) cada N segundos con throughput, retraso
+  y percentiles de latencia
+"""
+
+import json
+import sys
+import time
+from contextlib import contextmanager, nullcontext
+
+from profiling import percentile
+
+VERBOSITY_LEVELS = ('quiet', 'normal', 'verbose')
+
+
+class _BufferedStream:
+    """Sustituye a sys.stdout durante la captura: acumula el texto en memoria"""
+
+    def __init__(self, reporter, stream):
+        self.reporter = reporter
+        self.stream = stream
+
+    def write(self, text):
+        self.reporter._buffer(text)
+        return len(text)
+
+    def flush(self):
+        pass
+
+    def __getattr__(self, name):
+        return getattr(self.stream, name)
+
+
+class Reporter:
+    """Acumula, limita y resume la salida de un proceso del ejercicio"""
+
+    def __init__(self, role, verbosity='verbose', interval=5.0, summary_interval=None,
+                 max_lines=200):
+        if verbosity not in VERBOSITY_LEVELS:
+            raise ValueError(f"Nivel de verbosidad desconocido: {verbosity}")
+        self.role = role
+        self.verbosity = verbosity
+        self.interval = interval            # Segundos entre volcados (nivel normal)
+        self.max_lines = max_lines          # Líneas como máximo por volcado
+        # Sin indicarlo, los resúmenes solo se emiten fuera del nivel verbose
+        if summary_interval is None:
+            summary_interval = 0 if verbosity == 'verbose' else 10.0
+        self.summary_interval = summary_interval
+
+        self.pending = []
+        self.dropped_lines = 0
+        self.last_flush = time.time()
+
+        # Métricas del periodo actual del resumen
+        self.start_time = time.time()
+        self.last_summary = self.start_time
+        self.records = 0
+        self.total_records = 0
+        self.latencies = []
+        self.lag = None
+
+    def capture(self):
+        """Contexto que acumula lo impreso en lugar de escribirlo (salvo en nivel verbose)"""
+        if self.verbosity == 'verbose':
+            return nullcontext()
+        return self._capture()
+
+    @contextmanager
+    def _capture(self):
+        original = sys.stdout
+        sys.stdout = _BufferedStream(self, original)
+        try:
+            yield
+        finally:
+            sys.stdout = original
+
+    def _buffer(self, text):
+        if self.verbosity == 'quiet':
+            return
+        self.pending.append(text)
+
+    def flush(self, force=False):
+        """Escribe lo acumulado si ha pasado el intervalo (o siempre con force)"""
+        now = time.time()
+        if not self.pending or (not force and now - self.last_flush < self.interval):
+            return
+        text = ''.join(self.pending)
+        self.pending = []
+        self.last_flush = now
+
+        # Limitar el volumen: conservar las últimas líneas del intervalo
+        lines = text.splitlines(keepends=True)
+        if len(lines) > self.max_lines:
+            omitted = len(lines) - self.max_lines
+            self.dropped_lines += omitted
+            lines = [f"… {omitted} líneas omitidas\n"] + lines[-self.max_lines:]
+        sys.stdout.write(''.join(lines))
+        sys.stdout.flush()
+
+    def observe(self, records, latency_ms, lag=None):
+        """Registra una iteración procesada para el próximo resumen"""
+        self.records += records
+        self.total_records += records
+        self.latencies.append(latency_ms)
+        if lag is not None:
+            self.lag = lag
+
+    def summary(self, now=None):
+        """Resumen del periodo actual como diccionario"""
+        now = now or time.time()
+        elapsed = max(now - self.last_summary, 1e-9)
+        return {
+            'ts': round(now, 3),
+            'role': self.role,
+            'uptime_s': round(now - self.start_time, 1),
+            'records': self.records,
+            'total_records': self.total_records,
+            'throughput': round(self.records / elapsed, 2),
+            'lag': self.lag,
+            'latency_ms': {f"p{q}": round(percentile(self.latencies, q), 3) for q in (50, 95, 99)},
+            'iterations': len(self.latencies),
+            'dropped_lines': self.dropped_lines
+        }
+
+    def maybe_summary(self, force=False):
+        """Emite la línea JSON de resumen cada summary_interval segundos"""
+        now = time.time()
+        if not self.summary_interval and not force:
+            return None
+        if not force and now - self.last_summary < self.summary_interval:
+            return None
+        summary = self.summary(now)
+        self.flush(force=True)  # Mantener el orden con la salida acumulada
+        sys.stdout.write(json.dumps(summary, ensure_ascii=False) + "\n")
+        sys.stdout.flush()
+        self.last_summary = now
+        self.records = 0
+        self.latencies = []
+        return summary
+
+    def close(self):
+        """Vuelca lo pendiente y, si hay resúmenes, emite el último"""
+        self.flush(force=True)
+        if self.summary_interval and (self.records or self.latencies):
+            self.maybe_summary(force=True)
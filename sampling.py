@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Muestreo y estimación aproximada para el modo degradado del consumer
+Reservoir sampling (algoritmo R) y estimadores con intervalos de confianza
+"""
+
+import math
+import random
+
+# Valores z para los niveles de confianza habituales
+Z_VALUES = {0.90: 1.645, 0.95: 1.960, 0.99: 2.576}
+
+
+class ReservoirSampler:
+    """Mantiene una muestra uniforme de tamaño fijo de un flujo de longitud desconocida"""
+
+    def __init__(self, capacity, seed=None):
+        if capacity <= 0:
+            raise ValueError("La capacidad del reservoir debe ser positiva")
+        self.capacity = capacity
+        self.sample = []
+        self.seen = 0
+        self._random = random.Random(seed)
+
+    def add(self, item):
+        """Ofrece un elemento al reservoir"""
+        self.seen += 1
+        if len(self.sample) < self.capacity:
+            self.sample.append(item)
+        else:
+            j = self._random.randrange(self.seen)
+            if j < self.capacity:
+                self.sample[j] = item
+
+    def extend(self, items):
+        """Ofrece varios elementos al reservoir"""
+        for item in items:
+            self.add(item)
+
+
+def _standard_error(values, population_size):
+    """Error estándar de la media muestral con corrección por población finita"""
+    n = len(values)
+    if n < 2 or population_size <= 1:
+        return 0.0
+    mean = sum(values) / n
+    variance = sum((v - mean) ** 2 for v in values) / (n - 1)
+    fpc = (population_size - n) / (population_size - 1) if population_size > n else 0.0
+    return math.sqrt(variance / n * fpc)
+
+
+def estimate_total(values, population_size, confidence=0.95):
+    """Estima el total de la población a partir de una muestra uniforme.
+
+    Devuelve (estimación, semiancho del intervalo de confianza).
+    """
+    if not values:
+        return 0.0, 0.0
+    z = Z_VALUES.get(confidence, 1.960)
+    mean = sum(values) / len(values)
+    half_width = z * population_size * _standard_error(values, population_size)
+    return mean * population_size, half_width
+
+
+def estimate_count(flags, population_size, confidence=0.95):
+    """Estima cuántos elementos de la población cumplen una condición (flags 0/1)"""
+    return estimate_total([1 if flag else 0 for flag in flags], population_size, confidence)
@@ -0,0 +1,305 @@
+#!/usr/bin/env python3
+"""
+Sketches probabilísticos para analítica con memoria acotada sobre el flujo
+- HyperLogLog: número de valores distintos
+- Count-Min: frecuencia aproximada de claves (p.ej. tipos de valores corruptos)
+- KLL: cuantiles aproximados de los valores
+
+Todos los sketches son combinables con merge(), de modo que varios consumers
+(o un lector por formato) pueden unir sus resúmenes.
+"""
+
+import hashlib
+import math
+import random
+import sys
+from array import array
+
+
+def _hash64(item, seed=0):
+    """Hash de 64 bits estable entre procesos (hash() de Python no lo es para str)"""
+    digest = hashlib.blake2b(repr(item).encode(), digest_size=8,
+                             salt=seed.to_bytes(8, 'little')).digest()
+    return int.from_bytes(digest, 'little')
+
+
+class HyperLogLog:
+    """Estimación del número de elementos distintos con 2^p registros de 1 byte"""
+
+    def __init__(self, p=12):
+        if not 4 <= p <= 16:
+            raise ValueError("La precisión p debe estar entre 4 y 16")
+        self.p = p
+        self.m = 1 << p
+        self.registers = bytearray(self.m)
+        
+        if self.m == 16:
+            self._alpha = 0.673
+        elif self.m == 32:
+            self._alpha = 0.697
+        elif self.m == 64:
+            self._alpha = 0.709
+        else:
+            self._alpha = 0.7213 / (1 + 1.079 / self.m)
+
+    def add(self, item):
+        """Añade un elemento al sketch"""
+        x = _hash64(item)
+        index = x >> (64 - self.p)
+        rest = x & ((1 << (64 - self.p)) - 1)
+        rank = (64 - self.p) - rest.bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def count(self):
+        """Número estimado de elementos distintos"""
+        estimate = self._alpha * self.m * self.m / sum(2.0 ** -r for r in self.registers)
+        zeros = self.registers.count(0)
+        # Corrección para cardinalidades pequeñas (linear counting)
+        if estimate <= 2.5 * self.m and zeros:
+            return self.m * math.log(self.m / zeros)
+        return estimate
+
+    def merge(self, other):
+        """Combina otro HyperLogLog con la misma precisión"""
+        if other.p != self.p:
+            raise ValueError("Solo se pueden combinar HyperLogLog con la misma precisión")
+        for i, r in enumerate(other.registers):
+            if r > self.registers[i]:
+                self.registers[i] = r
+        return self
+
+    def relative_error(self):
+        """Error estándar relativo teórico"""
+        return 1.04 / math.sqrt(self.m)
+
+    def memory_bytes(self):
+        return sys.getsizeof(self.registers)
+
+
+class CountMinSketch:
+    """Frecuencias aproximadas (nunca subestima) con error <= epsilon * N con probabilidad 1 - delta"""
+
+    def __init__(self, epsilon=0.01, delta=0.01):
+        self.epsilon = epsilon
+        self.delta = delta
+        self.width = math.ceil(math.e / epsilon)
+        self.depth = math.ceil(math.log(1 / delta))
+        self.table = [array('L', [0]) * self.width for _ in range(self.depth)]
+        self.total = 0
+
+    def _columns(self, item):
+        """Columna de cada fila (doble hashing a partir de un único hash de 64 bits)"""
+        x = _hash64(item)
+        h1, h2 = x & 0xFFFFFFFF, x >> 32
+        return [(h1 + row * h2) % self.width for row in range(self.depth)]
+
+    def add(self, item, count=1):
+        """Suma count ocurrencias de item"""
+        for row, column in enumerate(self._columns(item)):
+            self.table[row][column] += count
+        self.total += count
+
+    def estimate(self, item):
+        """Frecuencia estimada de item"""
+        return min(self.table[row][column] for row, column in enumerate(self._columns(item)))
+
+    def merge(self, other):
+        """Combina otro Count-Min con las mismas dimensiones"""
+        if (other.width, other.depth) != (self.width, self.depth):
+            raise ValueError("Solo se pueden combinar Count-Min con las mismas dimensiones")
+        for row in range(self.depth):
+            mine, theirs = self.table[row], other.table[row]
+            for column in range(self.width):
+                mine[column] += theirs[column]
+        self.total += other.total
+        return self
+
+    def error_bound(self):
+        """Cota del error absoluto (epsilon * N)"""
+        return self.epsilon * self.total
+
+    def memory_bytes(self):
+        return sum(sys.getsizeof(row) for row in self.table)
+
+
+class KLLSketch:
+    """Cuantiles aproximados con compactadores de capacidad decreciente (Karnin, Lang, Liberty)"""
+
+    def __init__(self, k=200, seed=None):
+        self.k = k
+        self.compactors = [[]]
+        self.n = 0
+        self.min_value = None
+        self.max_value = None
+        self._random = random.Random(seed)
+
+    def _capacity(self, level):
+        """Capacidad del compactador de un nivel (los niveles altos son los mayores)"""
+        depth = len(self.compactors) - level - 1
+        return max(2, int(math.ceil(self.k * (2 / 3) ** depth)))
+
+    def _size(self):
+        return sum(len(c) for c in self.compactors)
+
+    def _max_size(self):
+        return sum(self._capacity(level) for level in range(len(self.compactors)))
+
+    def add(self, value):
+        """Añade un valor al sketch"""
+        self.n += 1
+        if self.min_value is None or value < self.min_value:
+            self.min_value = value
+        if self.max_value is None or value > self.max_value:
+            self.max_value = value
+        self.compactors[0].append(value)
+        if self._size() >= self._max_size():
+            self._compress()
+
+    def _compress(self):
+        """Compacta el primer nivel que supera su capacidad"""
+        for level in range(len(self.compactors)):
+            if len(self.compactors[level]) >= self._capacity(level):
+                if level + 1 == len(self.compactors):
+                    self.compactors.append([])
+                items = sorted(self.compactors[level])
+                # Si hay un número impar de elementos, uno se queda en el nivel
+                leftover = [items.pop()] if len(items) % 2 else []
+                offset = self._random.randint(0, 1)
+                self.compactors[level + 1].extend(items[offset::2])
+                self.compactors[level] = leftover
+                if self._size() < self._max_size():
+                    break
+
+    def merge(self, other):
+        """Combina otro KLLSketch"""
+        while len(self.compactors) < len(other.compactors):
+            self.compactors.append([])
+        for level, items in enumerate(other.compactors):
+            self.compactors[level].extend(items)
+        self.n += other.n
+        if other.min_value is not None:
+            self.min_value = other.min_value if self.min_value is None else min(self.min_value, other.min_value)
+            self.max_value = other.max_value if self.max_value is None else max(self.max_value, other.max_value)
+        while self._size() >= self._max_size():
+            self._compress()
+        return self
+
+    def quantile(self, q):
+        """Valor aproximado del cuantil q (0 <= q <= 1)"""
+        if self.n == 0:
+            return None
+        if q <= 0:
+            return self.min_value
+        if q >= 1:
+            return self.max_value
+        weighted = sorted((value, 1 << level)
+                          for level, items in enumerate(self.compactors) for value in items)
+        total_weight = sum(weight for _, weight in weighted)
+        target = q * total_weight
+        cumulative = 0
+        for value, weight in weighted:
+            cumulative += weight
+            if cumulative >= target:
+                return value
+        return self.max_value
+
+    def rank_error(self):
+        """Error de rango normalizado aproximado (~1.65 / k)"""
+        return 1.65 / self.k
+
+    def memory_bytes(self):
+        return (sys.getsizeof(self.compactors)
+                + sum(sys.getsizeof(c) + sum(sys.getsizeof(v) for v in c) for c in self.compactors))
+
+
+def classify_corruption(value, expected):
+    """Tipo de corrupción introducido por el producer (introduce_error) o None si es correcto"""
+    if value == expected:
+        return None
+    if value == expected * 10:
+        return '*10'
+    if value == expected + 1000:
+        return '+1000'
+    if value == -expected:
+        return 'negado'
+    return 'otro'
+
+
+class StreamSummary:
+    """Resumen de un flujo con sketches y, opcionalmente, los resultados exactos para comparar"""
+
+    CORRUPTION_KINDS = ('*10', '+1000', 'negado', 'otro')
+
+    def __init__(self, exact=False, hll_precision=12, cms_epsilon=0.01, kll_k=200):
+        self.hll = HyperLogLog(hll_precision)
+        self.cms = CountMinSketch(cms_epsilon)
+        self.kll = KLLSketch(kll_k)
+        self.n = 0
+        
+        # Resultados exactos (memoria sin acotar) solo para el benchmark: desactivados por defecto
+        self.exact = exact
+        self.exact_values = []
+        self.exact_corruptions = {kind: 0 for kind in self.CORRUPTION_KINDS}
+
+    def add(self, value, expected=None):
+        """Añade un registro; expected es el valor correcto según la secuencia del producer"""
+        self.n += 1
+        self.hll.add(value)
+        self.kll.add(value)
+        kind = classify_corruption(value, expected) if expected is not None else None
+        if kind:
+            self.cms.add(kind)
+        if self.exact:
+            self.exact_values.append(value)
+            if kind:
+                self.exact_corruptions[kind] += 1
+
+    def merge(self, other):
+        """Combina otro resumen (p.ej. el de otro formato u otro consumer)"""
+        self.hll.merge(other.hll)
+        self.cms.merge(other.cms)
+        self.kll.merge(other.kll)
+        self.n += other.n
+        self.exact = self.exact and other.exact
+        if self.exact:
+            self.exact_values.extend(other.exact_values)
+            for kind, count in other.exact_corruptions.items():
+                self.exact_corruptions[kind] += count
+        return self
+
+    def sketch_memory_bytes(self):
+        return self.hll.memory_bytes() + self.cms.memory_bytes() + self.kll.memory_bytes()
+
+    def exact_memory_bytes(self):
+        """Memoria aproximada de las estructuras exactas equivalentes (set de distintos + lista de valores)"""
+        if not self.exact:
+            return 0
+        distinct = set(self.exact_values)
+        return (sys.getsizeof(distinct) + sys.getsizeof(self.exact_values)
+                + sum(sys.getsizeof(v) for v in self.exact_values)
+                + sys.getsizeof(self.exact_corruptions))
+
+    def report(self, quantiles=(0.5, 0.9, 0.99)):
+        """Resultados aproximados junto a los exactos (si se mantienen)"""
+        result = {
+            'n': self.n,
+            'distinct': self.hll.count(),
+            'distinct_error': self.hll.relative_error(),
+            'corruptions': {kind: self.cms.estimate(kind) for kind in self.CORRUPTION_KINDS},
+            'corruptions_error': self.cms.error_bound(),
+            'quantiles': {q: self.kll.quantile(q) for q in quantiles},
+            'quantile_rank_error': self.kll.rank_error(),
+            'sketch_bytes': self.sketch_memory_bytes()
+        }
+        if self.exact and self.exact_values:
+            ordered = sorted(self.exact_values)
+            n = len(ordered)
+            result['exact'] = {
+                'distinct': len(set(ordered)),
+                'corruptions': dict(self.exact_corruptions),
+                # Mismo rango que KLL: el menor valor con al menos q·n registros <= él
+                'quantiles': {q: ordered[max(0, math.ceil(q * n) - 1)] for q in quantiles},
+                'bytes': self.exact_memory_bytes()
+            }
+        return result
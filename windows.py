@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Ventanas de agregación para el consumer del ejercicio de las 4 Vs del Big Data
+Ventanas tumbling y sliding por número de registros o por timestamp del producer
+"""
+
+from collections import deque
+
+
+class WindowAggregator:
+    """Agrega un flujo de registros en ventanas tumbling o sliding.
+
+    Mantiene suma, conteo, errores, mínimo y máximo de forma incremental
+    (O(1) amortizado por registro) usando deques monótonos para min/max.
+    El estado está acotado por el tamaño de la ventana.
+    """
+
+    def __init__(self, window_type='tumbling', by='count', size=10, slide=None):
+        if window_type not in ('tumbling', 'sliding'):
+            raise ValueError(f"Tipo de ventana desconocido: {window_type}")
+        if by not in ('count', 'time'):
+            raise ValueError(f"Criterio de ventana desconocido: {by}")
+        if size <= 0:
+            raise ValueError("El tamaño de la ventana debe ser positivo")
+        
+        self.window_type = window_type
+        self.by = by
+        self.size = int(size) if by == 'count' else float(size)
+        
+        # En tumbling el desplazamiento coincide siempre con el tamaño
+        if window_type == 'tumbling' or slide is None:
+            slide = size
+        if slide <= 0 or slide > size:
+            raise ValueError("El desplazamiento debe estar entre 0 y el tamaño de la ventana")
+        self.slide = int(slide) if by == 'count' else float(slide)
+        
+        # Registros dentro de la ventana: (secuencia, timestamp, valor, es_error)
+        self._records = deque()
+        self._min_deque = deque()  # (secuencia, valor) con valores crecientes
+        self._max_deque = deque()  # (secuencia, valor) con valores decrecientes
+        self._sum = 0
+        self._errors = 0
+        
+        self._seq = 0              # Registros vistos en total
+        self._watermark = None     # Mayor timestamp visto (para ventanas por tiempo)
+        self._next_end = None      # Fin de la próxima ventana por tiempo
+
+    def _push(self, value, ts, error):
+        """Añade un registro a la ventana actual"""
+        seq = self._seq
+        self._seq += 1
+        self._records.append((seq, ts, value, error))
+        self._sum += value
+        self._errors += 1 if error else 0
+        
+        while self._min_deque and self._min_deque[-1][1] >= value:
+            self._min_deque.pop()
+        self._min_deque.append((seq, value))
+        
+        while self._max_deque and self._max_deque[-1][1] <= value:
+            self._max_deque.pop()
+        self._max_deque.append((seq, value))
+
+    def _pop_oldest(self):
+        """Elimina el registro más antiguo de la ventana"""
+        seq, _, value, error = self._records.popleft()
+        self._sum -= value
+        self._errors -= 1 if error else 0
+        if self._min_deque and self._min_deque[0][0] == seq:
+            self._min_deque.popleft()
+        if self._max_deque and self._max_deque[0][0] == seq:
+            self._max_deque.popleft()
+
+    def _clear(self):
+        """Vacía la ventana (cierre de ventana tumbling)"""
+        self._records.clear()
+        self._min_deque.clear()
+        self._max_deque.clear()
+        self._sum = 0
+        self._errors = 0
+
+    def _snapshot(self, start, end):
+        """Resultado agregado de la ventana actual"""
+        count = len(self._records)
+        return {
+            'start': start,
+            'end': end,
+            'count': count,
+            'sum': self._sum,
+            'min': self._min_deque[0][1],
+            'max': self._max_deque[0][1],
+            'mean': self._sum / count,
+            'error_rate': self._errors / count
+        }
+
+    def add(self, value, ts=None, error=False):
+        """Añade un registro y devuelve la lista de ventanas cerradas"""
+        if self.by == 'count':
+            return self._add_by_count(value, ts, error)
+        return self._add_by_time(value, ts, error)
+
+    def _add_by_count(self, value, ts, error):
+        self._push(value, ts, error)
+        while len(self._records) > self.size:
+            self._pop_oldest()
+        
+        if self._seq < self.size or (self._seq - self.size) % self.slide != 0:
+            return []
+        
+        result = self._snapshot(self._seq - len(self._records), self._seq)
+        if self.window_type == 'tumbling':
+            self._clear()
+        return [result]
+
+    def _add_by_time(self, value, ts, error):
+        if ts is None:
+            raise ValueError("Las ventanas por tiempo necesitan el timestamp del registro")
+        
+        # Los registros tardíos se asignan a la marca de agua actual
+        if self._watermark is None or ts > self._watermark:
+            self._watermark = ts
+        ts = self._watermark
+        
+        if self._next_end is None:
+            self._next_end = (ts // self.slide + 1) * self.slide
+        
+        results = []
+        while ts >= self._next_end:
+            start = self._next_end - self.size
+            while self._records and self._records[0][1] < start:
+                self._pop_oldest()
+            if self._records:
+                results.append(self._snapshot(start, self._next_end))
+            if self.window_type == 'tumbling':
+                self._clear()
+            self._next_end += self.slide
+            
+            # Saltar directamente los huecos sin registros
+            if not self._records:
+                self._next_end = max(self._next_end, (ts // self.slide + 1) * self.slide)
+        
+        self._push(value, ts, error)
+        return results
+
+    def describe(self):
+        """Descripción corta de la ventana para la salida por consola"""
+        unit = 'registros' if self.by == 'count' else 's'
+        if self.window_type == 'tumbling':
+            return f"tumbling {self.size:g} {unit}"
+        return f"sliding {self.size:g} {unit} / paso {self.slide:g} {unit}"
@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+"""
+Perfiles de carga declarativos para el producer
+Definen en un archivo JSON o TOML la forma del tráfico sin tocar el código:
+- rate: lotes por segundo a lo largo del tiempo (constant, ramp, step, sinusoidal)
+- bursts: ráfagas de Poisson que multiplican el ritmo durante unos segundos
+- batch: números por lote a lo largo del tiempo (mismas curvas)
+- formats: probabilidad de escribir cada formato en un lote (con variety); un formato
+  omitido retrasa sus números hasta el siguiente lote en que se escribe
+- errors: probabilidad y tipos de error (con veracity)
+- seed: semilla para repetir la misma secuencia de decisiones aleatorias (las curvas
+  se evalúan con el reloj real, así que la carga no es idéntica entre ejecuciones)
+"""
+
+import json
+import math
+import random
+from pathlib import Path
+
+try:
+    import tomllib  # Python 3.11+
+except ImportError:
+    tomllib = None
+
+CURVE_TYPES = ('constant', 'ramp', 'step', 'sinusoidal')
+ERROR_TYPES = ('multiply', 'add', 'negative')
+FORMATS = ('txt', 'csv', 'json')
+
+
+def _check_number(value, name, minimum=None, maximum=None, positive=False):
+    """Comprueba que un parámetro es numérico y está dentro de su rango"""
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        raise ValueError(f"'{name}' debe ser un número")
+    if positive and value <= 0:
+        raise ValueError(f"'{name}' debe ser mayor que 0")
+    if minimum is not None and value < minimum:
+        raise ValueError(f"'{name}' debe ser al menos {minimum}")
+    if maximum is not None and value > maximum:
+        raise ValueError(f"'{name}' debe ser como mucho {maximum}")
+
+
+def _validate_curve(curve, name):
+    """Comprueba que una curva tiene un tipo conocido y sus parámetros"""
+    if not isinstance(curve, dict) or curve.get('type') not in CURVE_TYPES:
+        raise ValueError(f"'{name}' debe ser una curva de tipo {', '.join(CURVE_TYPES)}")
+    required = {
+        'constant': ('value',),
+        'ramp': ('start', 'end', 'duration'),
+        'step': ('steps',),
+        'sinusoidal': ('mean', 'amplitude', 'period')
+    }[curve['type']]
+    missing = [key for key in required if key not in curve]
+    if missing:
+        raise ValueError(f"A la curva '{name}' le faltan parámetros: {', '.join(missing)}")
+    
+    # Valores que harían fallar al producer a mitad de la ejecución
+    if curve['type'] == 'step':
+        steps = curve['steps']
+        if not isinstance(steps, list) or not steps:
+            raise ValueError(f"'{name}.steps' debe ser una lista no vacía de [tiempo, valor]")
+        for step in steps:
+            if not isinstance(step, (list, tuple)) or len(step) != 2:
+                raise ValueError(f"Cada elemento de '{name}.steps' debe ser [tiempo, valor]")
+            _check_number(step[0], f"{name}.steps (tiempo)")
+            _check_number(step[1], f"{name}.steps (valor)")
+        return
+    for key in required:
+        _check_number(curve[key], f"{name}.{key}", positive=(key == 'period'))
+
+
+def evaluate_curve(curve, t):
+    """Valor de una curva en el instante t (segundos desde el inicio)"""
+    kind = curve['type']
+    if kind == 'constant':
+        return curve['value']
+    if kind == 'ramp':
+        progress = min(max(t / curve['duration'], 0.0), 1.0) if curve['duration'] > 0 else 1.0
+        return curve['start'] + (curve['end'] - curve['start']) * progress
+    if kind == 'step':
+        # steps: [[t0, valor0], [t1, valor1], ...] ordenados por tiempo
+        value = curve['steps'][0][1]
+        for start, step_value in curve['steps']:
+            if t >= start:
+                value = step_value
+        return value
+    # sinusoidal
+    return curve['mean'] + curve['amplitude'] * math.sin(2 * math.pi * t / curve['period'])
+
+
+class WorkloadProfile:
+    """Perfil de carga cargado desde un archivo JSON o TOML"""
+
+    def __init__(self, config, name=None):
+        self.name = config.get('name', name or 'perfil')
+        self.seed = config.get('seed')
+        self.rate = config.get('rate')
+        self.bursts = config.get('bursts')
+        self.batch = config.get('batch')
+        self.formats = config.get('formats')
+        self.errors = config.get('errors')
+        self._validate()
+        
+        self.random = random.Random(self.seed)
+        self._burst_until = -1.0
+        self._next_burst = None
+
+    @classmethod
+    def load(cls, filepath):
+        """Carga un perfil desde un archivo .json o .toml"""
+        path = Path(filepath)
+        if path.suffix == '.toml':
+            if tomllib is None:
+                raise ValueError("Los perfiles TOML necesitan Python 3.11+ (tomllib)")
+            with open(path, 'rb') as f:
+                config = tomllib.load(f)
+        else:
+            with open(path, 'r') as f:
+                config = json.load(f)
+        return cls(config, name=path.stem)
+
+    def _validate(self):
+        if self.rate is not None:
+            _validate_curve(self.rate, 'rate')
+        if self.batch is not None:
+            _validate_curve(self.batch, 'batch')
+        if self.bursts is not None:
+            missing = [key for key in ('rate', 'duration', 'factor') if key not in self.bursts]
+            if missing:
+                raise ValueError(f"A 'bursts' le faltan parámetros: {', '.join(missing)}")
+            _check_number(self.bursts['rate'], 'bursts.rate', positive=True)
+            _check_number(self.bursts['duration'], 'bursts.duration', minimum=0)
+            _check_number(self.bursts['factor'], 'bursts.factor', minimum=0)
+        if self.formats is not None:
+            unknown = set(self.formats) - set(FORMATS)
+            if unknown:
+                raise ValueError(f"Formatos desconocidos en 'formats': {', '.join(sorted(unknown))}")
+            for fmt, probability in self.formats.items():
+                _check_number(probability, f"formats.{fmt}", minimum=0, maximum=1)
+            # Un formato que nunca se escribe acumularía sus números retrasados sin límite
+            never = [fmt for fmt in FORMATS if not self.formats.get(fmt)]
+            if never:
+                raise ValueError(f"'formats' necesita una probabilidad mayor que 0 para: {', '.join(never)}")
+        if self.errors is not None:
+            unknown = set(self.errors.get('types', {})) - set(ERROR_TYPES)
+            if unknown:
+                raise ValueError(f"Tipos de error desconocidos: {', '.join(sorted(unknown))}")
+            if 'probability' in self.errors:
+                _check_number(self.errors['probability'], 'errors.probability', minimum=0, maximum=1)
+            weights = self.errors.get('types') or {}
+            for kind, weight in weights.items():
+                _check_number(weight, f"errors.types.{kind}", minimum=0)
+            if weights and not sum(weights.values()):
+                raise ValueError("'errors.types' necesita al menos un peso mayor que 0")
+
+    def reseed(self, offset):
+        """Deriva una semilla distinta (p.ej. por producer) manteniendo la reproducibilidad"""
+        if self.seed is not None:
+            self.random.seed(self.seed + offset)
+
+    def _in_burst(self, t):
+        """Ráfagas como proceso de Poisson: inicio con tiempos entre llegadas exponenciales"""
+        if not self.bursts:
+            return False
+        if self._next_burst is None:
+            self._next_burst = t + self.random.expovariate(self.bursts['rate'])
+        while t >= self._next_burst:
+            self._burst_until = self._next_burst + self.bursts['duration']
+            self._next_burst += self.random.expovariate(self.bursts['rate'])
+        return t < self._burst_until
+
+    def sleep_time(self, t):
+        """Tiempo de espera hasta el próximo lote o None si el perfil no define el ritmo"""
+        if self.rate is None:
+            return None
+        rate = evaluate_curve(self.rate, t)
+        if self._in_burst(t):
+            rate *= self.bursts['factor']
+        rate = max(rate, 0.01)
+        if self.rate.get('arrivals') == 'poisson':
+            # Llegadas de Poisson: tiempos entre lotes exponenciales con media 1/rate
+            return self.random.expovariate(rate)
+        return 1.0 / rate
+
+    def batch_size(self, t):
+        """Números por lote o None si el perfil no define el tamaño"""
+        if self.batch is None:
+            return None
+        return max(1, int(round(evaluate_curve(self.batch, t))))
+
+    def active_formats(self):
+        """Formatos que se escriben en este lote (según su probabilidad)"""
+        if self.formats is None:
+            return list(FORMATS)
+        return [fmt for fmt in FORMATS
+                if fmt in self.formats and self.random.random() < self.formats[fmt]]
+
+    def error_probability(self, default):
+        if self.errors is None:
+            return default
+        return self.errors.get('probability', default)
+
+    def error_type(self):
+        """Tipo de error según los pesos del perfil (uniforme si no se indican)"""
+        weights = (self.errors or {}).get('types')
+        if not weights:
+            return self.random.choice(ERROR_TYPES)
+        kinds = list(weights)
+        return self.random.choices(kinds, weights=[weights[k] for k in kinds])[0]
+
+    def describe(self):
+        """Descripción corta del perfil para la salida por consola"""
+        parts = []
+        if self.rate:
+            parts.append(f"rate={self.rate['type']}")
+        if self.bursts:
+            parts.append("ráfagas")
+        if self.batch:
+            parts.append(f"batch={self.batch['type']}")
+        if self.formats:
+            parts.append("formats=" + "/".join(f"{k}:{v:g}" for k, v in self.formats.items()))
+        if self.errors:
+            parts.append(f"errors={self.errors.get('probability', '-')}")
+        parts.append(f"seed={self.seed}")
+        return f"{self.name} ({', '.join(parts)})"